@@ -0,0 +1,765 @@
+import aiohttp
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+
+from circuit_breaker import OPEN, CircuitBreakerRegistry, CircuitOpenError
+from deadline import DeadlineExceeded
+from json_decoding import JSONDecoder
+from logging_config import configure_logging
+from key_pool import APIKeyPool, PooledKey
+from metrics import Metrics
+from profiling import PhaseProfiler
+from key_validation import VALIDATION_ENDPOINTS, ValidationCache
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from retry_policy import RetryPolicy
+from solscan_scraper import (
+    DEFAULT_BASE_URL,
+    ENGAGEMENT_THRESHOLD,
+    EngagementBatchWriter,
+    EngagementRecord,
+    LookupFailedError,
+    conditional_headers,
+    create_output_dir,
+    endpoint_key,
+    log_endpoint_stats,
+    log_key_stats,
+    log_memo_stats,
+    log_run_summary,
+    save_discovered_addresses,
+    score_engagement,
+)
+from singleflight import AsyncSingleFlight
+from tracing import span
+from ttl_lru_cache import TTLLRUCache
+
+
+class InvalidJSONError(aiohttp.ClientError):
+    """
+    Raised when a response body cannot be decoded, like requests' InvalidJSONError
+    """
+
+
+# Errors raised for failed or timed out requests, open circuits and undecodable response bodies
+# (InvalidJSONError); the ValueError raised when no API key is valid is left to propagate
+REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError)
+# Errors that count as an endpoint failure for its circuit breaker
+CONNECTION_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSolscanScraper:
+    """
+    asyncio counterpart of SolscanScraper
+
+    Every API call is a coroutine and a semaphore bounds how many requests are
+    in flight at once. Use as an async context manager:
+
+        async with AsyncSolscanScraper(concurrency=20) as scraper:
+            data = await scraper.find_engaged_wallets(address)
+    """
+
+    def __init__(self, concurrency: int = 20, timeout: float = 30.0, connect_timeout: float = 5.0,
+                 rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 cache: Optional[ResponseCache] = None, memo_size: int = 10_000, memo_ttl: float = 600,
+                 lazy_validation: bool = True, validation_cache: Optional[ValidationCache] = None,
+                 json_backend: str = 'auto', breakers: Optional[CircuitBreakerRegistry] = None,
+                 key_pool: Optional[APIKeyPool] = None,
+                 base_url: Optional[str] = None, metrics: Optional[Metrics] = None):
+        """
+        Args:
+            concurrency: Maximum number of requests in flight at once
+            timeout: Total timeout in seconds for each request
+            connect_timeout: Connect timeout in seconds for each request
+            rate_limiter: Limiter for each API key; further keys get copies (defaults to a RateLimiter())
+            retry_policy: Retries for transient failures (defaults to a RetryPolicy())
+            cache: Optional on-disk response cache consulted before every request
+            memo_size: Maximum number of account lookups memoized in memory (0 disables)
+            memo_ttl: Seconds a memoized account lookup stays valid
+            lazy_validation: Defer API key validation to the first real request
+            validation_cache: Remembers validated keys on disk (defaults to a ValidationCache())
+            json_backend: JSON decoder for response bodies: 'auto', 'orjson', 'msgspec' or 'json'
+            breakers: Per-endpoint circuit breakers (defaults to a CircuitBreakerRegistry())
+            key_pool: API keys to spread requests over (defaults to the keys in
+                SOLSCAN_API_KEYS or SOLSCAN_API_KEY, each limited like ``rate_limiter``)
+            base_url: API root (defaults to SOLSCAN_BASE_URL or the public Solscan API),
+                e.g. a local mock_solscan_server
+            metrics: Per-endpoint request metrics (defaults to a Metrics())
+        """
+        load_dotenv()
+        self.base_url = (base_url or os.getenv('SOLSCAN_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.key_pool = key_pool or APIKeyPool.from_env(rate_limiter)
+        self.headers = {
+            'Accept': 'application/json',
+        }
+        self.concurrency = concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.decoder = JSONDecoder(json_backend)
+        # Account lookups repeated within a run are served from memory
+        self.account_memo = TTLLRUCache(memo_size, memo_ttl)
+        self.request_count = 0
+        self.retry_count = 0
+        self.metrics = metrics or Metrics()
+        self.inflight = AsyncSingleFlight()
+        self.breakers = breakers or CircuitBreakerRegistry()
+        # Addresses whose lookups were skipped by an open circuit, to be retried later
+        self.deferred_addresses: Set[str] = set()
+        # Addresses with a lookup that failed after every retry
+        self.failed_addresses: Set[str] = set()
+        self.lazy_validation = lazy_validation
+        self.validation_cache = validation_cache or ValidationCache()
+        self._validated = False
+        self._validation_lock: Optional[asyncio.Lock] = None
+        self.discovered_addresses = set()
+
+    async def open(self):
+        """
+        Open the HTTP session, validating the API key now unless validation is lazy
+        """
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._validation_lock = asyncio.Lock()
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self.session = aiohttp.ClientSession(headers=self.headers, timeout=self.timeout, connector=connector)
+        if not self.lazy_validation:
+            await self._ensure_validated()
+
+    async def close(self):
+        """
+        Close the HTTP session and its connections
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _ensure_validated(self):
+        """
+        Validate the API keys once, before the first request that needs them
+
+        Keys that fail validation are dropped from the pool; ValueError is
+        raised only if none is left.
+        """
+        if self._validated:
+            return
+        async with self._validation_lock:
+            if not self._validated:
+                invalid = []
+                for pooled in self.key_pool.keys:
+                    if self.validation_cache.is_valid(pooled.key):
+                        logger.info("API key %s validated recently, skipping validation", pooled.name)
+                        continue
+                    try:
+                        await self._validate_api_key(pooled)
+                    except ValueError as e:
+                        logger.error("Dropping API key %s: %s", pooled.name, e)
+                        invalid.append(pooled)
+                        continue
+                    self.validation_cache.remember(pooled.key)
+                self.key_pool.discard(invalid)
+                self._validated = True
+
+    async def _validate_api_key(self, pooled: PooledKey):
+        """
+        Validate an API key by probing several endpoints concurrently
+        """
+        async def probe(endpoint: str):
+            logger.info("Trying to validate API key %s with endpoint: %s%s", pooled.name, self.base_url, endpoint)
+            try:
+                await self.key_pool.acquire_async(endpoint, pooled)
+                async with self.session.get(f"{self.base_url}{endpoint}", headers={'token': pooled.key}) as response:
+                    return endpoint, response.status, None
+            except REQUEST_ERRORS as e:
+                return endpoint, None, e
+
+        probes = [asyncio.ensure_future(probe(endpoint)) for endpoint in VALIDATION_ENDPOINTS]
+        try:
+            for next_done in asyncio.as_completed(probes):
+                endpoint, status, error = await next_done
+                if error is not None:
+                    logger.warning("Error with endpoint %s: %s", endpoint, error)
+                elif status == 200:
+                    logger.info("API key validated successfully")
+                    return
+                elif status == 403:
+                    logger.warning("Access denied for endpoint %s", endpoint)
+                else:
+                    logger.warning("Unexpected status code %d for endpoint %s", status, endpoint)
+        finally:
+            # Don't wait for the remaining probes once one has succeeded
+            for task in probes:
+                task.cancel()
+
+        raise ValueError("Could not validate API key with any endpoint. Please check your API key and try again.")
+
+    async def _get(self, path: str, params: Optional[Dict] = None,
+                   decode: Optional[Callable[[bytes], Any]] = None) -> Any:
+        """
+        Shared request path: serve from the response cache if possible, otherwise
+        wait for the rate limiter and a concurrency slot, send the request and
+        decode the JSON body
+
+        Transient failures are retried per the retry policy, and concurrent
+        calls for the same path and parameters share one request.
+        """
+        await self._ensure_validated()
+        decode = decode or self.decoder.loads
+        endpoint = endpoint_key(path)
+        key = ResponseCache.make_key(path, params)
+        if self.cache is not None:
+            body = self.cache.get(endpoint, key)
+            if body is not None:
+                return self._decode(decode, body)
+
+        return await self.inflight.do((key, decode), lambda: self._fetch(path, params, endpoint, key, decode))
+
+    @staticmethod
+    def _decode(decode: Callable[[bytes], Any], body: bytes) -> Any:
+        try:
+            with span('decode', bytes=len(body)):
+                return decode(body)
+        except ValueError as e:
+            raise InvalidJSONError(f"Could not decode response body: {str(e)}")
+
+    async def _fetch(self, path: str, params: Optional[Dict], endpoint: str, key: str,
+                     decode: Callable[[bytes], Any]) -> Any:
+        """
+        Fetch a response from the API, store it in the response cache and decode it
+
+        Fails fast with CircuitOpenError while the endpoint's circuit is open.
+        Connection errors, timeouts and retryable statuses are retried according
+        to the retry policy; a request that still fails counts once against the
+        endpoint's circuit. After a 429, or a 403 that benched a key, the retry
+        goes out without backoff since the key pool itself holds back the
+        affected key; moving to another key this way does not use up one of the
+        attempts, until every key has been tried.
+
+        When the cache holds a copy with an ETag or Last-Modified validator the
+        request is made conditional, and a 304 answer is served from that copy.
+        """
+        breaker = self.breakers.get(endpoint)
+        breaker.before_call()
+        stored = self.cache.get_validators(key) if self.cache is not None else None
+        headers = conditional_headers(stored)
+        policy = self.retry_policy
+        delay = 0.0
+        attempt = 0
+        key_switches = 0
+        while True:
+            last_attempt = attempt == policy.max_attempts - 1
+            # Back off outside the semaphore so other requests keep flowing
+            if delay > 0:
+                with span('backoff', endpoint=endpoint):
+                    await asyncio.sleep(delay)
+            with span('rate_limit', endpoint=endpoint):
+                pooled = await self.key_pool.acquire_async(endpoint)
+            try:
+                async with self._semaphore:
+                    self.request_count += 1
+                    self.metrics.request_started(endpoint)
+                    started = time.perf_counter()
+                    try:
+                        with span('request', endpoint=endpoint, attempt=attempt + 1) as request_span:
+                            async with self.session.get(f"{self.base_url}{path}", params=params,
+                                                        headers={**(headers or {}), 'token': pooled.key}) as response:
+                                body = await response.read()
+                            request_span.set(status=response.status, bytes=len(body))
+                    except BaseException:
+                        self.metrics.request_finished(endpoint, None, time.perf_counter() - started)
+                        raise
+                    self.metrics.request_finished(endpoint, response.status, time.perf_counter() - started, len(body))
+
+                throttle = self.key_pool.update_from_response(pooled, endpoint, response.status, response.headers)
+                # A benched key's request moves to another key until all were tried
+                switch_key = throttle is not None and key_switches < len(self.key_pool.keys) - 1
+                retryable = policy.is_retryable_status(response.status) or switch_key
+                if retryable and (switch_key or not last_attempt):
+                    if throttle is not None:
+                        delay = 0.0
+                        logger.warning("Status %d from %s, backing off key %s for %.1fs",
+                                       response.status, endpoint, pooled.name, throttle)
+                    else:
+                        delay = policy.backoff(attempt)
+                        logger.warning("Status %d from %s, retrying in %.1fs", response.status, endpoint, delay)
+                    if switch_key:
+                        key_switches += 1
+                    else:
+                        attempt += 1
+                    self.retry_count += 1
+                    self.metrics.retried(endpoint)
+                    continue
+
+                if response.status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status == 304 and stored is not None:
+                    self.cache.revalidated(key)
+                    body = stored[0]
+                else:
+                    response.raise_for_status()
+                    if self.cache is not None:
+                        self.cache.set(endpoint, key, body,
+                                       response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                return self._decode(decode, body)
+            except CONNECTION_ERRORS as e:
+                if last_attempt:
+                    breaker.record_failure()
+                    raise
+                delay = policy.backoff(attempt)
+                attempt += 1
+                self.retry_count += 1
+                self.metrics.retried(endpoint)
+                logger.warning("Error requesting %s: %s. Retrying in %.1fs", endpoint, e, delay)
+
+    async def get_recent_transactions(self, limit: int = 100) -> List[Dict]:
+        """
+        Get recent transactions from Solscan
+        """
+        try:
+            data = await self._get('/transaction/last', {'limit': limit})
+            if isinstance(data, dict) and 'error' in data:
+                logger.error("API error: %s", data['error'])
+                return []
+            return data
+        except REQUEST_ERRORS as e:
+            logger.error("Error fetching recent transactions: %s", e)
+            return []
+
+    async def get_top_tokens(self, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """
+        Get top Solana tokens by market cap, starting ``offset`` tokens down the list
+        """
+        try:
+            return await self._get_top_tokens_page(limit, offset)
+        except REQUEST_ERRORS as e:
+            logger.error("Error fetching top tokens: %s", e)
+            return []
+
+    async def _get_top_tokens_page(self, limit: int, offset: int) -> List[Dict]:
+        params = {'limit': limit, 'sortBy': 'marketCap', 'sortType': 'desc'}
+        if offset:
+            params['offset'] = offset
+        return await self._get('/token/list', params)
+
+    async def iter_top_tokens(self, page_size: int = 50) -> AsyncIterator[Dict]:
+        """
+        Lazily walk the token list by market cap, page by page
+
+        Async counterpart of SolscanScraper.iter_top_tokens: the next page is
+        prefetched in a task while the caller works through the current one,
+        and a page that cannot be fetched raises instead of ending the walk.
+        """
+        async def fetch_page(offset: int) -> List[Dict]:
+            try:
+                return await self._get_top_tokens_page(page_size, offset)
+            except CircuitOpenError as e:
+                logger.warning("%s; requesting tokens from offset %d again", e, offset)
+                await asyncio.sleep(e.retry_in)
+                return await self._get_top_tokens_page(page_size, offset)
+
+        offset = 0
+        next_page = asyncio.ensure_future(fetch_page(offset))
+        try:
+            while next_page is not None:
+                page = await next_page or []
+                next_page = None
+                if len(page) >= page_size:
+                    offset += page_size
+                    next_page = asyncio.ensure_future(fetch_page(offset))
+                for token in page:
+                    yield token
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def get_token_holders(self, token_address: str, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """
+        Get the largest holders of a token, starting ``offset`` holders down the list
+        """
+        try:
+            return await self._get_token_holders_page(token_address, limit, offset)
+        except REQUEST_ERRORS as e:
+            logger.warning("Error fetching holders for token %s: %s", token_address, e)
+            return []
+
+    async def _get_token_holders_page(self, token_address: str, limit: int, offset: int) -> List[Dict]:
+        params = {'tokenAddress': token_address, 'limit': limit}
+        if offset:
+            params['offset'] = offset
+        return await self._get('/token/holders', params)
+
+    async def discover_addresses(self, max_addresses: int = 1000, concurrency: int = 8,
+                                 page_size: int = 50) -> Set[str]:
+        """
+        Discover active wallet addresses by analyzing recent transactions and token holders
+
+        Async counterpart of SolscanScraper.discover_addresses: holder pages are
+        crawled token by token down the market-cap list, at most ``concurrency``
+        at a time and no more than the addresses still needed can use, and the
+        outstanding requests are cancelled once ``max_addresses`` are found. A
+        failed holder page is queued again rather than read as the end of the
+        token's holders.
+        """
+        logger.info("Starting address discovery")
+
+        def needed() -> int:
+            return max_addresses - len(self.discovered_addresses)
+
+        tokens = self.iter_top_tokens(page_size)
+        # Holder pages in flight, and pages waiting for a free slot: (token, offset, failures so far)
+        pages: Dict[asyncio.Future, Tuple[str, int, int]] = {}
+        continuations: List[Tuple[str, int, int]] = []
+
+        def has_capacity() -> bool:
+            return len(pages) < concurrency and len(pages) * page_size < needed()
+
+        async def fetch_page(token_address: str, offset: int) -> List[Dict]:
+            try:
+                return await self._get_token_holders_page(token_address, page_size, offset)
+            except CircuitOpenError as e:
+                await asyncio.sleep(e.retry_in)
+                return await self._get_token_holders_page(token_address, page_size, offset)
+
+        def request(token_address: str, offset: int, failures: int = 0):
+            task = asyncio.ensure_future(fetch_page(token_address, offset))
+            pages[task] = (token_address, offset, failures)
+
+        async def top_up():
+            while has_capacity():
+                if continuations:
+                    request(*continuations.pop())
+                    continue
+                try:
+                    token = await tokens.__anext__()
+                except StopAsyncIteration:
+                    return
+                except REQUEST_ERRORS as e:
+                    # The walk ends with the failed page; carry on with the tokens listed so far
+                    logger.error("Error fetching top tokens, no further tokens will be crawled: %s", e)
+                    return
+                if 'address' in token:
+                    request(token['address'], 0)
+
+        try:
+            for tx in await self.get_recent_transactions(limit=100) or []:
+                if needed() <= 0:
+                    break
+                for field in ('owner', 'signer', 'fromAddress', 'toAddress'):
+                    if field in tx:
+                        self.discovered_addresses.add(tx[field])
+
+            await top_up()
+            while pages and needed() > 0:
+                done, _ = await asyncio.wait(pages, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    token_address, offset, failures = pages.pop(task)
+                    try:
+                        holders = task.result()
+                    except REQUEST_ERRORS as e:
+                        failures += 1
+                        if failures < self.retry_policy.max_attempts:
+                            logger.warning("Error fetching holders for token %s at offset %d, trying again: %s",
+                                           token_address, offset, e)
+                            continuations.append((token_address, offset, failures))
+                        else:
+                            logger.error("Error fetching holders for token %s at offset %d, giving up on "
+                                         "the token: %s", token_address, offset, e)
+                        continue
+                    for holder in holders:
+                        if needed() <= 0:
+                            break
+                        if 'owner' in holder:
+                            self.discovered_addresses.add(holder['owner'])
+                    if len(holders) >= page_size:
+                        continuations.append((token_address, offset + page_size, 0))
+                await top_up()
+        finally:
+            for task in pages:
+                task.cancel()
+            await tokens.aclose()
+
+        logger.info("Discovered %d unique addresses", len(self.discovered_addresses))
+        return self.discovered_addresses
+
+    async def get_account_info(self, address: str) -> Dict:
+        """
+        Get detailed information about a Solana account/wallet
+        """
+        key = ('info', address)
+        cached = self.account_memo.get(key)
+        if cached is not None:
+            return cached
+        try:
+            data = await self._get(f"/account/{address}")
+            self.account_memo.set(key, data)
+            return data
+        except REQUEST_ERRORS as e:
+            logger.warning("Error fetching account info for %s: %s", address, e)
+            if isinstance(e, CircuitOpenError):
+                self.deferred_addresses.add(address)
+            else:
+                self.failed_addresses.add(address)
+            return {}
+
+    async def get_account_transactions(self, address: str, limit: int = 100, typed: bool = False) -> List[Dict]:
+        """
+        Get transaction history for a specific account
+
+        With ``typed=True`` only the fields engagement scoring reads are decoded,
+        into compact structs when msgspec is installed.
+        """
+        params = {'account': address, 'limit': limit}
+        key = ('transactions', address, limit, typed)
+        cached = self.account_memo.get(key)
+        if cached is not None:
+            return cached
+        try:
+            decode = self.decoder.decode_transactions if typed else None
+            data = await self._get('/account/transactions', params, decode)
+            self.account_memo.set(key, data)
+            return data
+        except REQUEST_ERRORS as e:
+            logger.warning("Error fetching transactions for %s: %s", address, e)
+            if isinstance(e, CircuitOpenError):
+                self.deferred_addresses.add(address)
+            else:
+                self.failed_addresses.add(address)
+            return []
+
+    async def iter_account_transactions(self, address: str, since: Optional[int] = None,
+                                        until: Optional[int] = None, page_size: int = 50) -> AsyncIterator[Dict]:
+        """
+        Lazily walk an account's full transaction history, newest first
+
+        Async counterpart of SolscanScraper.iter_account_transactions: the next
+        page is prefetched in a task while the caller processes the current one.
+        """
+        async def fetch_page(before_hash: Optional[str]) -> List[Dict]:
+            params = {'account': address, 'limit': page_size}
+            if before_hash:
+                params['beforeHash'] = before_hash
+            return await self._get('/account/transactions', params)
+
+        next_page = asyncio.ensure_future(fetch_page(None))
+        try:
+            while next_page is not None:
+                page = await next_page or []
+                next_page = None
+
+                # Start fetching the following page before handing this one out
+                if len(page) >= page_size:
+                    cursor = page[-1].get('txHash')
+                    oldest = page[-1].get('blockTime')
+                    if cursor and not (since is not None and oldest is not None and oldest < since):
+                        next_page = asyncio.ensure_future(fetch_page(cursor))
+
+                for tx in page:
+                    block_time = tx.get('blockTime')
+                    if block_time is not None:
+                        if until is not None and block_time > until:
+                            continue
+                        if since is not None and block_time < since:
+                            return
+                    yield tx
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def get_token_holdings(self, address: str, typed: bool = False) -> List[Dict]:
+        """
+        Get token holdings for a specific account
+
+        With ``typed=True`` only the fields engagement scoring reads are decoded,
+        into compact structs when msgspec is installed.
+        """
+        key = ('tokens', address, typed)
+        cached = self.account_memo.get(key)
+        if cached is not None:
+            return cached
+        try:
+            decode = self.decoder.decode_holdings if typed else None
+            data = await self._get('/account/tokens', {'account': address}, decode)
+            self.account_memo.set(key, data)
+            return data
+        except REQUEST_ERRORS as e:
+            logger.warning("Error fetching token holdings for %s: %s", address, e)
+            if isinstance(e, CircuitOpenError):
+                self.deferred_addresses.add(address)
+            else:
+                self.failed_addresses.add(address)
+            return []
+
+    async def find_engaged_wallets(self, address: str) -> EngagementRecord:
+        """
+        Find wallets with engagement based on recent transactions and token holdings
+        Returns an EngagementRecord with engagement metrics
+        """
+        async def traced(name: str, lookup):
+            with span(name):
+                return await lookup
+
+        transactions, token_holdings = await asyncio.gather(
+            traced('get_account_transactions', self.get_account_transactions(address, limit=10, typed=True)),
+            traced('get_token_holdings', self.get_token_holdings(address, typed=True)),
+        )
+        with span('score'):
+            return score_engagement(address, transactions, token_holdings)
+
+
+async def analyze_addresses(scraper: AsyncSolscanScraper, addresses: List[str],
+                            writer: EngagementBatchWriter, deferred_passes: int = 1,
+                            wallet_budget: Optional[float] = None,
+                            profiler: Optional[PhaseProfiler] = None) -> EngagementBatchWriter:
+    """
+    Analyze wallet engagement for many addresses concurrently
+
+    A fixed pool of ``scraper.concurrency`` worker coroutines takes addresses
+    from a queue, so only that many wallets are in progress (and hold
+    rate-limiter slots) at a time, and results are handed to the writer as
+    they arrive. Addresses skipped by an open circuit are retried once the
+    circuits allow trial calls again; those a half-open circuit rejects while
+    its trial call is out are queued again, and a retry pass only counts
+    towards ``deferred_passes`` if it leaves a circuit open. An address still
+    unfinished ``wallet_budget`` seconds after a worker started on it is
+    cancelled and recorded as abandoned. With a ``profiler``, writing results
+    counts as the 'output' phase.
+    """
+    profiler = profiler or PhaseProfiler()
+
+    async def analyze_one(address: str):
+        with span('wallet', address=address) as wallet_span:
+            with span('find_engaged_wallets'):
+                engagement_data = await scraper.find_engaged_wallets(address)
+            wallet_span.set(score=engagement_data.engagement_score)
+            wallet_info = None
+            if engagement_data.engagement_score > ENGAGEMENT_THRESHOLD:
+                with span('get_account_info'):
+                    wallet_info = await scraper.get_account_info(address)
+        failed = address in scraper.failed_addresses
+        scraper.failed_addresses.discard(address)
+        if address in scraper.deferred_addresses:
+            scraper.deferred_addresses.discard(address)
+            raise CircuitOpenError('address lookups', scraper.breakers.seconds_until_retry())
+        if failed:
+            raise LookupFailedError(f"A lookup for {address} failed")
+        return engagement_data, wallet_info
+
+    def handle(address: str, result, error: Optional[BaseException], deferred: List[str], can_defer: bool):
+        if isinstance(error, CircuitOpenError) and can_defer:
+            deferred.append(address)
+        elif isinstance(error, DeadlineExceeded):
+            logger.warning("Abandoned address %s: %s", address, error)
+            writer.record_abandoned(address)
+        elif error is not None:
+            logger.warning("Error processing address %s: %s", address, error)
+            writer.record_error(address)
+        else:
+            with profiler.phase('output'):
+                writer.record(*result)
+            logger.debug("Processed address %d/%d: %s", writer.processed_count, writer.total_addresses, address)
+
+    async def worker(queue: asyncio.Queue, deferred: List[str], can_defer: bool):
+        while True:
+            address = await queue.get()
+            try:
+                # The budget starts only now that the wallet's work begins
+                result = await asyncio.wait_for(analyze_one(address), wallet_budget)
+            except asyncio.TimeoutError:
+                scraper.deferred_addresses.discard(address)
+                scraper.failed_addresses.discard(address)
+                handle(address, None, DeadlineExceeded(f"Analysis exceeded its {wallet_budget:.0f}s budget"),
+                       deferred, can_defer)
+            except Exception as e:
+                handle(address, None, e, deferred, can_defer)
+            else:
+                handle(address, result, None, deferred, can_defer)
+            finally:
+                queue.task_done()
+
+    pending = addresses
+    passes_left = deferred_passes
+    while True:
+        deferred: List[str] = []
+        queue: asyncio.Queue = asyncio.Queue()
+        for address in pending:
+            queue.put_nowait(address)
+        workers = [asyncio.ensure_future(worker(queue, deferred, passes_left > 0))
+                   for _ in range(min(scraper.concurrency, len(pending)))]
+        finished = asyncio.ensure_future(queue.join())
+        try:
+            done, _ = await asyncio.wait([finished, *workers], return_when=asyncio.FIRST_COMPLETED)
+            # Workers only stop early on an error, e.g. a failed write; re-raise it
+            for task in done:
+                if task is not finished:
+                    task.result()
+        finally:
+            for task in [finished, *workers]:
+                task.cancel()
+
+        if not deferred:
+            break
+        if pending is not addresses and OPEN in scraper.breakers.states().values():
+            passes_left -= 1
+        wait = scraper.breakers.seconds_until_retry()
+        logger.info("Retrying %d deferred addresses in %.0fs", len(deferred), wait)
+        await asyncio.sleep(wait)
+        pending = deferred
+
+    with profiler.phase('output'):
+        writer.close()
+    return writer
+
+
+async def run_async(max_addresses: int = 1000, batch_size: int = 50, concurrency: int = 20,
+                    rate_limiter: Optional[RateLimiter] = None, cache: Optional[ResponseCache] = None,
+                    validation_cache: Optional[ValidationCache] = None, json_backend: str = 'auto',
+                    retry_policy: Optional[RetryPolicy] = None, wallet_budget: Optional[float] = None,
+                    request_timeout: float = 30.0, base_url: Optional[str] = None,
+                    metrics: Optional[Metrics] = None, profiler: Optional[PhaseProfiler] = None):
+    """
+    Run both phases of the scraper with the asyncio client
+    """
+    profiler = profiler or PhaseProfiler()
+    async with AsyncSolscanScraper(concurrency=concurrency, timeout=request_timeout, rate_limiter=rate_limiter,
+                                   cache=cache, validation_cache=validation_cache, json_backend=json_backend,
+                                   retry_policy=retry_policy, base_url=base_url, metrics=metrics) as scraper:
+        logger.info("Phase 1: Discovering active wallet addresses")
+        with profiler.phase('discovery'):
+            addresses_to_scrape = list(await scraper.discover_addresses(max_addresses=max_addresses))
+        with profiler.phase('output'):
+            save_discovered_addresses(addresses_to_scrape)
+
+        logger.info("Phase 2: Analyzing wallet engagement (%d concurrent requests)", concurrency)
+        writer = EngagementBatchWriter(create_output_dir(), len(addresses_to_scrape), batch_size)
+        with profiler.phase('analysis'):
+            await analyze_addresses(scraper, addresses_to_scrape, writer, wallet_budget=wallet_budget,
+                                    profiler=profiler)
+        log_run_summary(len(addresses_to_scrape), writer)
+        logger.info("- Sent %d API requests", scraper.request_count)
+        logger.info("- Rate limited %d times by the API, retried %d requests",
+                    scraper.key_pool.throttled_count(), scraper.retry_count)
+        logger.info("- Coalesced %d duplicate in-flight requests", scraper.inflight.shared_count)
+        logger.info("- Failed fast on %d requests to endpoints with an open circuit", scraper.breakers.rejected_count())
+        log_key_stats(scraper.key_pool)
+        log_memo_stats(scraper.account_memo)
+        log_endpoint_stats(scraper.metrics)
+
+
+if __name__ == "__main__":
+    configure_logging()
+    asyncio.run(run_async())
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from typing import Dict
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while the endpoint's circuit is open
+    """
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Circuit open for {endpoint}, retrying in {retry_in:.0f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one endpoint
+
+    Closed: requests flow normally and consecutive failures are counted.
+    Open: after ``failure_threshold`` consecutive failures every call fails fast
+    for ``recovery_timeout`` seconds. Half-open: after the timeout a limited
+    number of trial calls go through; a success closes the circuit again and a
+    failure re-opens it. A trial call that never reports back (e.g. it was
+    abandoned at a deadline) frees its slot after another ``recovery_timeout``.
+    """
+
+    def __init__(self, endpoint: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.rejected_count = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Check whether a call may go out, raising CircuitOpenError if it may not
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == OPEN:
+                retry_in = self.opened_at + self.recovery_timeout - now
+                if retry_in > 0:
+                    self.rejected_count += 1
+                    raise CircuitOpenError(self.endpoint, retry_in)
+                self.state = HALF_OPEN
+                self.half_open_calls = 0
+                self.opened_at = now
+            elif now - self.opened_at > self.recovery_timeout:
+                self.half_open_calls = 0
+                self.opened_at = now
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.rejected_count += 1
+                raise CircuitOpenError(self.endpoint, self.recovery_timeout)
+            self.half_open_calls += 1
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning("Opening circuit for %s after %d consecutive failures", self.endpoint, self.failures)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def seconds_until_retry(self) -> float:
+        """
+        Seconds until the circuit lets a call through (0 if it already would)
+
+        A half-open circuit whose trial calls are all out frees their slots after
+        ``recovery_timeout`` at the latest.
+        """
+        with self._lock:
+            if self.state == CLOSED or (self.state == HALF_OPEN and self.half_open_calls < self.half_open_max_calls):
+                return 0.0
+            return max(self.opened_at + self.recovery_timeout - time.monotonic(), 0.0)
+
+
+class CircuitBreakerRegistry:
+    """
+    One CircuitBreaker per endpoint, created on first use
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(
+                    endpoint, self.failure_threshold, self.recovery_timeout, self.half_open_max_calls
+                )
+            return breaker
+
+    def seconds_until_retry(self) -> float:
+        """
+        Seconds until every circuit lets a call through
+        """
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return max((breaker.seconds_until_retry() for breaker in breakers), default=0.0)
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            return {endpoint: breaker.state for endpoint, breaker in self._breakers.items()}
+
+    def rejected_count(self) -> int:
+        with self._lock:
+            return sum(breaker.rejected_count for breaker in self._breakers.values())
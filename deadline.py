@@ -0,0 +1,68 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when the work for one wallet runs past its time budget
+    """
+
+
+class Deadline:
+    """
+    Point in time by which a unit of work must finish
+    """
+
+    def __init__(self, budget: float):
+        """
+        Args:
+            budget: Seconds from now until the deadline
+        """
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def check(self, what: str = 'operation'):
+        """
+        Raise DeadlineExceeded if the deadline has passed
+        """
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"{what} exceeded its {self.budget:.0f}s budget")
+
+    def clamp(self, timeout: float) -> float:
+        """
+        Shorten a timeout so it cannot run past the deadline
+        """
+        self.check()
+        return min(timeout, self.remaining())
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar('current_deadline', default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """
+    Return the deadline of the work running in this thread or task, if any
+    """
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline(budget: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Run the enclosed block under a deadline; every request it makes is bounded by it
+
+    A budget of None leaves the block unbounded.
+    """
+    if budget is None:
+        yield None
+        return
+    token = _current_deadline.set(Deadline(budget))
+    try:
+        yield _current_deadline.get()
+    finally:
+        _current_deadline.reset(token)
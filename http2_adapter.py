@@ -0,0 +1,154 @@
+import os
+import ssl
+import threading
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import DEFAULT_CA_BUNDLE_PATH, get_encoding_from_headers, select_proxy
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Connection-specific headers are not allowed in HTTP/2 requests
+HOP_BY_HOP_HEADERS = frozenset({'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'})
+
+
+class HTTP2Adapter(BaseAdapter):
+    """
+    requests transport adapter that sends requests over HTTP/2 with httpx
+
+    Requests from any number of threads are multiplexed as streams over one
+    connection per host instead of each holding a pooled socket. Servers that
+    do not negotiate HTTP/2 are spoken to over HTTP/1.1. Needs httpx with the
+    h2 extra (``pip install 'httpx[http2]'``).
+
+    The TLS verification, client certificate and proxy that requests resolves
+    for each request (including from REQUESTS_CA_BUNDLE and HTTPS_PROXY) are
+    honoured; since httpx fixes them per client, one client is kept for each
+    combination in use.
+    """
+
+    def __init__(self, max_connections: int = 10):
+        """
+        Args:
+            max_connections: Upper bound on connections per host (HTTP/2 normally needs only one)
+        """
+        if httpx is None:
+            raise ValueError("HTTP/2 needs httpx: pip install 'httpx[http2]'")
+        super().__init__()
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._clients: Dict[Tuple, 'httpx.Client'] = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.http2_responses = 0
+
+    def _client(self, verify: Union[bool, str], cert: Union[None, str, Tuple[str, str]],
+                proxy: Optional[str]) -> 'httpx.Client':
+        key = (verify, tuple(cert) if isinstance(cert, (list, tuple)) else cert, proxy)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                # requests has already applied the environment, so httpx must not apply it again
+                client = self._clients[key] = httpx.Client(http2=True, limits=self.limits,
+                                                           verify=_ssl_context(verify, cert), proxy=proxy,
+                                                           trust_env=False)
+            return client
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout=None, verify=True,
+             cert=None, proxies=None) -> requests.Response:
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        headers = [(name, value) for name, value in request.headers.items()
+                   if name.lower() not in HOP_BY_HOP_HEADERS]
+        client = self._client(verify, cert, select_proxy(request.url, proxies or {}))
+        outgoing = client.build_request(
+            request.method, request.url, headers=headers, content=request.body,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            extensions={'trace': self._trace},
+        )
+        try:
+            response = client.send(outgoing, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+        if response.http_version == 'HTTP/2':
+            self.http2_responses += 1
+        return self.build_response(request, response)
+
+    def build_response(self, request: requests.PreparedRequest, response: 'httpx.Response') -> requests.Response:
+        """
+        Wrap an httpx response in a requests.Response whose body is read lazily
+        """
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.reason = response.reason_phrase
+        result.headers = CaseInsensitiveDict(response.headers.items())
+        result.encoding = get_encoding_from_headers(result.headers)
+        result.raw = _StreamedBody(response, request)
+        result.url = request.url
+        result.request = request
+        result.connection = self
+        return result
+
+    def _trace(self, event: str, info: dict):
+        if event == 'connection.connect_tcp.complete':
+            self.connections_opened += 1
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+def _ssl_context(verify: Union[bool, str], cert: Union[None, str, Tuple[str, str]]) -> Union[bool, ssl.SSLContext]:
+    """
+    Translate requests' ``verify`` and ``cert`` arguments into what httpx accepts
+    """
+    if not cert and isinstance(verify, bool):
+        return verify
+    if isinstance(verify, str):
+        if os.path.isdir(verify):
+            context = ssl.create_default_context(capath=verify)
+        else:
+            context = ssl.create_default_context(cafile=verify)
+    elif verify:
+        context = ssl.create_default_context(cafile=DEFAULT_CA_BUNDLE_PATH)
+    else:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if cert:
+        if isinstance(cert, str):
+            context.load_cert_chain(cert)
+        else:
+            context.load_cert_chain(*cert)
+    return context
+
+
+class _StreamedBody:
+    """
+    The body of an httpx response, exposed the way requests reads Response.raw
+    """
+
+    def __init__(self, response: 'httpx.Response', request: requests.PreparedRequest):
+        self._response = response
+        self._request = request
+
+    def stream(self, chunk_size: int, decode_content: bool = True) -> Iterator[bytes]:
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e, request=self._request)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=self._request)
+
+    def close(self):
+        self._response.close()
@@ -0,0 +1,110 @@
+import json
+from typing import Any, Callable, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+if msgspec is not None:
+    class TransactionSummary(msgspec.Struct):
+        """
+        The fields of an /account/transactions entry that engagement scoring reads
+        """
+        blockTime: Optional[int] = None
+        txHash: Optional[str] = None
+
+        def get(self, name: str, default: Any = None) -> Any:
+            return getattr(self, name, default)
+
+    class TokenAmount(msgspec.Struct):
+        """
+        The fields of an /account/tokens entry that engagement scoring reads
+        """
+        amount: Union[float, str, None] = None
+
+        def get(self, name: str, default: Any = None) -> Any:
+            return getattr(self, name, default)
+
+
+class JSONDecoder:
+    """
+    Pluggable JSON decoder for API response bodies
+
+    Uses orjson or msgspec when installed and falls back to the standard
+    library. With the 'auto' or 'msgspec' backend and msgspec installed, the
+    engagement decoders read only the fields find_engaged_wallets needs into
+    compact structs instead of full dicts.
+    Malformed bodies raise ValueError whichever backend is used.
+    """
+
+    BACKENDS = ('auto', 'orjson', 'msgspec', 'json')
+
+    def __init__(self, backend: str = 'auto'):
+        """
+        Args:
+            backend: One of 'auto', 'orjson', 'msgspec' or 'json'
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown JSON backend {backend!r}, expected one of {', '.join(self.BACKENDS)}")
+        typed = backend in ('auto', 'msgspec') and msgspec is not None
+        if backend == 'auto':
+            backend = 'orjson' if orjson is not None else 'msgspec' if msgspec is not None else 'json'
+        if backend == 'orjson' and orjson is None:
+            raise ValueError("orjson is not installed")
+        if backend == 'msgspec' and msgspec is None:
+            raise ValueError("msgspec is not installed")
+        self.backend = backend
+
+        if backend == 'orjson':
+            self.loads: Callable[[bytes], Any] = orjson.loads
+        elif backend == 'msgspec':
+            self.loads = _raising_value_error(msgspec.json.Decoder().decode)
+        else:
+            self.loads = json.loads
+
+        # Typed decoding needs msgspec; with 'auto' it is used whichever backend decodes
+        # everything else, while an explicit 'orjson' or 'json' decodes every body with that backend
+        self._transactions_decoder = msgspec.json.Decoder(List[TransactionSummary]) if typed else None
+        self._holdings_decoder = msgspec.json.Decoder(List[TokenAmount]) if typed else None
+
+    def decode_transactions(self, body: bytes) -> Any:
+        """
+        Decode an /account/transactions body, into TransactionSummary structs when possible
+        """
+        return self._decode_typed(self._transactions_decoder, body)
+
+    def decode_holdings(self, body: bytes) -> Any:
+        """
+        Decode an /account/tokens body, into TokenAmount structs when possible
+        """
+        return self._decode_typed(self._holdings_decoder, body)
+
+    def _decode_typed(self, decoder, body: bytes) -> Any:
+        if decoder is None:
+            return self.loads(body)
+        try:
+            return decoder.decode(body)
+        except msgspec.ValidationError:
+            # Not the expected list shape (e.g. an error object), decode it generically
+            return self.loads(body)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+
+def _raising_value_error(decode: Callable[[bytes], Any]) -> Callable[[bytes], Any]:
+    """
+    Wrap a msgspec decode function so malformed input raises ValueError like json.loads
+    """
+    def loads(body: bytes) -> Any:
+        try:
+            return decode(body)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    return loads
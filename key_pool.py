@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from deadline import Deadline, DeadlineExceeded
+from key_validation import key_fingerprint
+from rate_limiter import REMAINING_HEADERS, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+def is_throttled(status: int, headers: Mapping[str, str]) -> bool:
+    """
+    Whether a response says the key is over its quota, as opposed to lacking access
+
+    That is every 429, and a 403 only when it comes with Retry-After or reports
+    no remaining quota.
+    """
+    if status == 429:
+        return True
+    if status != 403:
+        return False
+    return headers.get('Retry-After') is not None or any(headers.get(name) == '0' for name in REMAINING_HEADERS)
+
+
+def load_api_keys() -> List[str]:
+    """
+    Read API keys from SOLSCAN_API_KEYS (comma-separated), falling back to SOLSCAN_API_KEY
+    """
+    keys = [key.strip() for key in os.getenv('SOLSCAN_API_KEYS', '').split(',') if key.strip()]
+    if not keys and os.getenv('SOLSCAN_API_KEY'):
+        keys = [os.getenv('SOLSCAN_API_KEY')]
+    # Keep the first occurrence of each key
+    return list(dict.fromkeys(keys))
+
+
+class PooledKey:
+    """
+    One API key with its own rate limiter and health state
+    """
+
+    def __init__(self, key: str, rate_limiter: RateLimiter):
+        self.key = key
+        self.rate_limiter = rate_limiter
+        # Monotonic time until which the key is rested, per endpoint
+        self.benched_until: Dict[str, float] = {}
+        self.bench_count = 0
+        self.request_count = 0
+
+    @property
+    def name(self) -> str:
+        """
+        Short fingerprint that identifies the key in output without revealing it
+        """
+        return key_fingerprint(self.key)[:8]
+
+
+class APIKeyPool:
+    """
+    Spread requests over several API keys, each with its own quota
+
+    Every request goes to the key with the most headroom, i.e. the one whose
+    rate limiter could let a request out soonest. When there is more than one
+    key, a key answered with 429 (or with a 403 that carries rate-limit
+    headers) is benched for that endpoint: it gets no requests to it until its
+    Retry-After (or ``bench_seconds``) has passed, while the others carry on.
+    If every key is benched, requests wait for the one that returns first.
+    """
+
+    def __init__(self, keys: Sequence[str], rate_limiter: Optional[RateLimiter] = None,
+                 bench_seconds: float = 60.0):
+        """
+        Args:
+            keys: API keys to use
+            rate_limiter: Limiter for the first key; the other keys get fresh limiters
+                configured the same way (defaults to a RateLimiter())
+            bench_seconds: Seconds a key is rested after a throttling response without Retry-After
+        """
+        if not keys:
+            raise ValueError("SOLSCAN_API_KEY not found in .env file")
+        rate_limiter = rate_limiter or RateLimiter()
+        self.keys = [PooledKey(key, rate_limiter if i == 0 else rate_limiter.clone()) for i, key in enumerate(keys)]
+        self.bench_seconds = bench_seconds
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, rate_limiter: Optional[RateLimiter] = None, bench_seconds: float = 60.0) -> 'APIKeyPool':
+        """
+        Build a pool from the keys in SOLSCAN_API_KEYS or SOLSCAN_API_KEY
+        """
+        return cls(load_api_keys(), rate_limiter, bench_seconds)
+
+    def _choose(self, endpoint: str, now: float) -> PooledKey:
+        available = [key for key in self.keys if key.benched_until.get(endpoint, 0.0) <= now]
+        if not available:
+            return min(self.keys, key=lambda key: key.benched_until.get(endpoint, 0.0))
+        return max(available, key=lambda key: key.rate_limiter.headroom(endpoint))
+
+    def reserve(self, endpoint: str, key: Optional[PooledKey] = None) -> Tuple[PooledKey, float]:
+        """
+        Pick a key (unless one is given) and reserve a request slot on it
+
+        Returns the key and the seconds to wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            key = key or self._choose(endpoint, now)
+            key.request_count += 1
+            delay = key.rate_limiter.reserve(endpoint)
+            return key, max(delay, key.benched_until.get(endpoint, 0.0) - now)
+
+    def _release(self, endpoint: str, key: PooledKey):
+        with self._lock:
+            key.request_count -= 1
+        key.rate_limiter.release(endpoint)
+
+    def acquire(self, endpoint: str, key: Optional[PooledKey] = None,
+                budget: Optional[Deadline] = None) -> PooledKey:
+        """
+        Block until a request to the endpoint may go out, and return the key to send it with
+
+        With a ``budget``, DeadlineExceeded is raised straight away (and the
+        slot given back) if the wait would run past it.
+        """
+        key, delay = self.reserve(endpoint, key)
+        if budget is not None and delay >= budget.remaining():
+            self._release(endpoint, key)
+            raise DeadlineExceeded(f"Waiting {delay:.1f}s to send a request to {endpoint} "
+                                   f"would exceed the {budget.budget:.0f}s budget")
+        if delay > 0:
+            time.sleep(delay)
+        return key
+
+    async def acquire_async(self, endpoint: str, key: Optional[PooledKey] = None) -> PooledKey:
+        """
+        Wait without blocking the event loop until a request may go out, and return its key
+
+        The slot is given back if the wait is cancelled.
+        """
+        key, delay = self.reserve(endpoint, key)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self._release(endpoint, key)
+                raise
+        return key
+
+    def update_from_response(self, key: PooledKey, endpoint: str, status: int,
+                             headers: Mapping[str, str], pinned: bool = False) -> Optional[float]:
+        """
+        Update the key's limiter and health from a response
+
+        Returns the seconds the key backs off for (after a 429, or a throttling
+        403 that benched it), otherwise None. Another key may take the retry
+        right away. A request ``pinned`` to its key, like a validation probe,
+        never benches it.
+        """
+        backoff = key.rate_limiter.update_from_response(endpoint, status, headers)
+        if pinned or len(self.keys) < 2 or not is_throttled(status, headers):
+            return backoff
+        rest = backoff if backoff is not None else self.bench_seconds
+        with self._lock:
+            key.benched_until[endpoint] = max(key.benched_until.get(endpoint, 0.0), time.monotonic() + rest)
+            key.bench_count += 1
+        logger.warning("Benching API key %s for %s for %.0fs after status %d", key.name, endpoint, rest, status)
+        return rest
+
+    def discard(self, keys: Iterable[PooledKey]):
+        """
+        Remove keys from the pool, e.g. after they failed validation
+        """
+        dropped = {id(key) for key in keys}
+        with self._lock:
+            remaining = [key for key in self.keys if id(key) not in dropped]
+            if not remaining:
+                raise ValueError("Could not validate API key with any endpoint. Please check your API key and try again.")
+            self.keys = remaining
+
+    def throttled_count(self) -> int:
+        return sum(key.rate_limiter.throttled_count for key in self.keys)
+
+    def stats(self) -> List[Dict]:
+        """
+        Report requests sent and times benched per key
+        """
+        return [
+            {'key': key.name, 'requests': key.request_count, 'benched': key.bench_count}
+            for key in self.keys
+        ]
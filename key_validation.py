@@ -0,0 +1,83 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+# Endpoints probed to check that an API key is accepted
+VALIDATION_ENDPOINTS = [
+    '/transaction/last',
+    '/token/list',
+    '/account/tokens'
+]
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_path() -> str:
+    cache_home = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'solscan_scraper', 'validated_keys.json')
+
+
+def key_fingerprint(api_key: str) -> str:
+    """
+    Fingerprint an API key so it can be remembered without storing the key itself
+    """
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:32]
+
+
+class ValidationCache:
+    """
+    Remember on disk which API keys validated successfully, for a configurable period
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 24 * 3600):
+        """
+        Args:
+            path: JSON file holding key fingerprints and validation times
+            ttl: Seconds a successful validation is trusted; 0 disables the cache
+        """
+        self.path = path or default_cache_path()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def is_valid(self, api_key: str) -> bool:
+        """
+        Check whether the key validated successfully within the last ``ttl`` seconds
+        """
+        if self.ttl <= 0:
+            return False
+        validated_at = self._load().get(key_fingerprint(api_key))
+        return validated_at is not None and time.time() - validated_at < self.ttl
+
+    def remember(self, api_key: str):
+        """
+        Record a successful validation of the key
+        """
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            now = time.time()
+            entries = {
+                fingerprint: validated_at
+                for fingerprint, validated_at in self._load().items()
+                if now - validated_at < self.ttl
+            }
+            entries[key_fingerprint(api_key)] = now
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning("Could not save API key validation cache: %s", e)
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+# Throughput summaries go to this logger, which stays enabled in quiet mode
+PROGRESS_LOGGER = 'solscan.progress'
+LOG_LEVELS = ('debug', 'info', 'warning', 'quiet')
+
+progress_logger = logging.getLogger(PROGRESS_LOGGER)
+
+
+class RateLimitedFilter(logging.Filter):
+    """
+    Let at most ``burst`` records of each message template through per ``interval`` seconds
+
+    Per-item messages (one per address, link or failed request) share a
+    template because formatting is lazy, so a flood of them is cut down to a
+    trickle. The number of dropped records is appended to the next record of
+    that template that gets through.
+    """
+
+    def __init__(self, burst: int = 10, interval: float = 10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        # (logger name, template) -> (window start, records let through, records dropped)
+        self._windows: Dict[Tuple[str, str], Tuple[float, int, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.name == PROGRESS_LOGGER or record.levelno >= logging.CRITICAL:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            started, passed, dropped = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.interval:
+                started, passed = now, 0
+            if passed >= self.burst:
+                self._windows[key] = (started, passed, dropped + 1)
+                return False
+            self._windows[key] = (started, passed + 1, 0)
+        if dropped:
+            record.msg = f"{record.msg} [{dropped} similar messages suppressed]"
+        return True
+
+
+def configure_logging(level: str = 'info', burst: int = 10, interval: float = 10.0):
+    """
+    Send log records to stderr with per-template rate limiting
+
+    Args:
+        level: 'debug', 'info' or 'warning' set the threshold; 'quiet' shows only
+            errors and the periodic throughput summaries
+        burst: Records of one message template let through per ``interval``
+        interval: Seconds after which the per-template allowance resets
+    """
+    if level not in LOG_LEVELS:
+        raise ValueError(f"Unknown log level {level!r}, expected one of {', '.join(LOG_LEVELS)}")
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, '%H:%M:%S'))
+    handler.addFilter(RateLimitedFilter(burst, interval))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(logging.ERROR if level == 'quiet' else getattr(logging, level.upper()))
+    progress_logger.setLevel(logging.INFO)
+
+
+class ThroughputReporter:
+    """
+    Periodically log how many items were processed and how fast
+
+    Replaces one log line per item: ``add`` only counts, and a summary is
+    logged at most every ``interval`` seconds plus once more on ``close``.
+    """
+
+    def __init__(self, what: str, total: Optional[int] = None, interval: float = 10.0):
+        """
+        Args:
+            what: Plural noun for the items, e.g. 'addresses'
+            total: Expected number of items, if known
+            interval: Minimum seconds between two summaries
+        """
+        self.what = what
+        self.total = total
+        self.interval = interval
+        self.count = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self._reported_at = self.started_at
+        self._reported_count = 0
+        self._lock = threading.Lock()
+
+    def add(self, count: int = 1, failed: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            self.count += count
+            if failed:
+                self.failed += count
+            if now - self._reported_at < self.interval:
+                return
+            recent_rate = (self.count - self._reported_count) / (now - self._reported_at)
+            self._reported_at, self._reported_count = now, self.count
+            count, failed = self.count, self.failed
+        progress_logger.info("%s %s (%.1f/s, %d failed)", self._progress(count), self.what, recent_rate, failed)
+
+    def close(self):
+        """
+        Log the final count and the average rate over the whole run
+        """
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        progress_logger.info("Done: %s %s in %.1fs (%.1f/s, %d failed)", self._progress(self.count), self.what,
+                             elapsed, self.count / elapsed, self.failed)
+
+    def _progress(self, count: int) -> str:
+        return f"{count}/{self.total}" if self.total is not None else str(count)
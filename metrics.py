@@ -0,0 +1,219 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram, cheap enough to update on every request
+
+    Quantiles are estimated by interpolating within the bucket they fall in.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One extra slot for observations above the last bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-quantile (0 < q < 1) of the observed latencies, or None if there are none
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class EndpointMetrics:
+    """
+    Counters for one endpoint
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses: Dict[str, int] = {}
+        self.bytes_received = 0
+        self.in_flight = 0
+        self.retries = 0
+        self.latency = LatencyHistogram()
+
+
+class Metrics:
+    """
+    Per-endpoint request metrics: counts, status codes, bytes received, latency
+    histograms, in-flight gauges and retries
+
+    Shared by every thread (or task) of a scraper. ``render`` produces the
+    Prometheus text exposition format served by MetricsServer.
+    """
+
+    def __init__(self):
+        self._endpoints: Dict[str, EndpointMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, endpoint: str) -> EndpointMetrics:
+        metrics = self._endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self._endpoints[endpoint] = EndpointMetrics()
+        return metrics
+
+    def request_started(self, endpoint: str):
+        with self._lock:
+            metrics = self._get(endpoint)
+            metrics.requests += 1
+            metrics.in_flight += 1
+
+    def request_finished(self, endpoint: str, status: Optional[int], seconds: float, body_size: int = 0):
+        """
+        Record the outcome of a request; ``status`` is None when no response arrived
+        """
+        label = str(status) if status is not None else 'error'
+        with self._lock:
+            metrics = self._get(endpoint)
+            metrics.in_flight -= 1
+            metrics.statuses[label] = metrics.statuses.get(label, 0) + 1
+            metrics.bytes_received += body_size
+            metrics.latency.observe(seconds)
+
+    def retried(self, endpoint: str):
+        with self._lock:
+            self._get(endpoint).retries += 1
+
+    def summary(self) -> List[Dict]:
+        """
+        Report the counters and latency quantiles of every endpoint
+        """
+        with self._lock:
+            return [
+                {
+                    'endpoint': endpoint,
+                    'requests': metrics.requests,
+                    'statuses': dict(metrics.statuses),
+                    'bytes_received': metrics.bytes_received,
+                    'retries': metrics.retries,
+                    **{f'p{int(q * 100)}': metrics.latency.quantile(q) for q in QUANTILES},
+                }
+                for endpoint, metrics in sorted(self._endpoints.items())
+            ]
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format
+        """
+        lines = []
+
+        def family(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for labels, value in samples)
+
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            family('solscan_requests_total', 'counter', 'API requests sent, including retries',
+                   [(_labels(endpoint=endpoint), m.requests) for endpoint, m in endpoints])
+            family('solscan_responses_total', 'counter', 'API responses by status code (error: no response)',
+                   [(_labels(endpoint=endpoint, status=status), count)
+                    for endpoint, m in endpoints for status, count in sorted(m.statuses.items())])
+            family('solscan_response_bytes_total', 'counter', 'Response body bytes received',
+                   [(_labels(endpoint=endpoint), m.bytes_received) for endpoint, m in endpoints])
+            family('solscan_requests_in_flight', 'gauge', 'API requests currently in flight',
+                   [(_labels(endpoint=endpoint), m.in_flight) for endpoint, m in endpoints])
+            family('solscan_retries_total', 'counter', 'API requests retried after a transient failure',
+                   [(_labels(endpoint=endpoint), m.retries) for endpoint, m in endpoints])
+
+            samples = []
+            for endpoint, m in endpoints:
+                cumulative = 0
+                for bound, count in zip(m.latency.buckets, m.latency.counts):
+                    cumulative += count
+                    samples.append((_labels(endpoint=endpoint, le=_format_value(bound)), cumulative))
+                samples.append((_labels(endpoint=endpoint, le='+Inf'), m.latency.count))
+            lines.append('# HELP solscan_request_duration_seconds API request latency, including the body')
+            lines.append('# TYPE solscan_request_duration_seconds histogram')
+            lines.extend(f"solscan_request_duration_seconds_bucket{labels} {value}" for labels, value in samples)
+            for endpoint, m in endpoints:
+                lines.append(f"solscan_request_duration_seconds_sum{_labels(endpoint=endpoint)} "
+                             f"{_format_value(m.latency.sum)}")
+                lines.append(f"solscan_request_duration_seconds_count{_labels(endpoint=endpoint)} {m.latency.count}")
+
+            family('solscan_request_duration_quantile_seconds', 'gauge',
+                   'Estimated API request latency quantiles',
+                   [(_labels(endpoint=endpoint, quantile=str(q)), m.latency.quantile(q))
+                    for endpoint, m in endpoints for q in QUANTILES if m.latency.count])
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels: str) -> str:
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsServer:
+    """
+    Serve a Metrics registry on http://host:port/metrics from a background thread
+    """
+
+    def __init__(self, metrics: Metrics, port: int, host: str = '127.0.0.1'):
+        handler = type('MetricsHandler', (_MetricsHandler,), {'metrics': metrics})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> 'MetricsServer':
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics: Metrics
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,349 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from rate_limiter import TokenBucket
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+# Block time of the newest synthetic transaction, fixed so runs are reproducible
+NEWEST_BLOCK_TIME = 1_700_000_000
+
+
+def _rng(*parts: Any) -> random.Random:
+    """
+    Random generator seeded from the given values, so the same request always gets the same data
+    """
+    seed = hashlib.sha256('/'.join(str(part) for part in parts).encode('utf-8')).digest()
+    return random.Random(int.from_bytes(seed[:8], 'big'))
+
+
+def _address(rng: random.Random) -> str:
+    return ''.join(rng.choice(BASE58_ALPHABET) for _ in range(44))
+
+
+class SyntheticData:
+    """
+    Deterministic stand-in data for the Solscan endpoints the scrapers use
+    """
+
+    def __init__(self, seed: int = 0, token_count: int = 500, holders_per_token: int = 1000,
+                 max_transactions: int = 200):
+        """
+        Args:
+            seed: Changes every generated value while keeping runs reproducible
+            token_count: Number of tokens /token/list pages through
+            holders_per_token: Number of holders /token/holders pages through for each token
+            max_transactions: Upper bound on the transaction history of one account
+        """
+        self.seed = seed
+        self.token_count = token_count
+        self.holders_per_token = holders_per_token
+        self.max_transactions = max_transactions
+        self._token_indexes = {self.token_address(index): index for index in range(token_count)}
+
+    def token_address(self, index: int) -> str:
+        return _address(_rng(self.seed, 'token', index))
+
+    def holder_address(self, token_index: int, index: int) -> str:
+        # Holders overlap between tokens, like real wallets holding several tokens
+        wallet = _rng(self.seed, 'holder', token_index, index).randrange(self.token_count * self.holders_per_token // 4)
+        return _address(_rng(self.seed, 'wallet', wallet))
+
+    def recent_transactions(self, limit: int) -> List[Dict]:
+        bucket = int(time.time() // 10)
+        rng = _rng(self.seed, 'last', bucket)
+        return [
+            {
+                'txHash': _address(rng) + _address(rng),
+                'blockTime': int(time.time()) - i,
+                'signer': _address(rng),
+                'fromAddress': _address(rng),
+                'toAddress': _address(rng),
+                'fee': 5000,
+                'status': 'Success',
+            }
+            for i in range(limit)
+        ]
+
+    def token_list(self, offset: int, limit: int) -> List[Dict]:
+        tokens = []
+        for index in range(offset, min(offset + limit, self.token_count)):
+            rng = _rng(self.seed, 'token-info', index)
+            tokens.append({
+                'address': self.token_address(index),
+                'symbol': ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(4)),
+                'decimals': rng.choice([6, 8, 9]),
+                'marketCap': round(1e9 / (index + 1), 2),
+                'holder': self.holders_per_token,
+            })
+        return tokens
+
+    def token_holders(self, token_address: str, offset: int, limit: int) -> List[Dict]:
+        token_index = self._token_indexes.get(token_address)
+        if token_index is None:
+            return []
+        holders = []
+        for index in range(offset, min(offset + limit, self.holders_per_token)):
+            holders.append({
+                'address': _address(_rng(self.seed, 'token-account', token_index, index)),
+                'owner': self.holder_address(token_index, index),
+                'amount': int(1e12 / (index + 1)),
+                'decimals': 6,
+                'rank': index + 1,
+            })
+        return holders
+
+    def account(self, address: str) -> Dict:
+        rng = _rng(self.seed, 'account', address)
+        return {
+            'account': address,
+            'lamports': rng.randrange(10 ** 12),
+            'ownerProgram': '11111111111111111111111111111111',
+            'type': 'system_account',
+            'rentEpoch': 361,
+            'executable': False,
+        }
+
+    def transactions(self, address: str) -> List[Dict]:
+        rng = _rng(self.seed, 'history', address)
+        # Most wallets are quiet, a few are very active
+        count = min(int(rng.expovariate(1 / 15)), self.max_transactions)
+        block_time = NEWEST_BLOCK_TIME - rng.randrange(86400 * 30)
+        history = []
+        for _ in range(count):
+            history.append({
+                'txHash': _address(rng) + _address(rng),
+                'blockTime': block_time,
+                'slot': block_time * 2,
+                'fee': 5000,
+                'status': 'Success',
+                'signer': [address],
+            })
+            block_time -= rng.randrange(1, 86400)
+        return history
+
+    def account_transactions(self, address: str, limit: int, before_hash: Optional[str]) -> List[Dict]:
+        history = self.transactions(address)
+        start = 0
+        if before_hash:
+            start = next((i + 1 for i, tx in enumerate(history) if tx['txHash'] == before_hash), len(history))
+        return history[start:start + limit]
+
+    def account_tokens(self, address: str) -> List[Dict]:
+        rng = _rng(self.seed, 'tokens', address)
+        holdings = []
+        for _ in range(min(int(rng.expovariate(1 / 3)), 50)):
+            amount = round(rng.expovariate(1 / 200), 6)
+            holdings.append({
+                'tokenAddress': self.token_address(rng.randrange(self.token_count)),
+                'tokenAccount': _address(rng),
+                'amount': amount,
+                'tokenAmount': {'uiAmount': amount, 'decimals': 6},
+            })
+        return holdings
+
+
+class FaultProfile:
+    """
+    Latency, error and throttling behaviour of the mock server
+    """
+
+    def __init__(self, latency: float = 0.05, latency_sigma: float = 0.5, error_rate: float = 0.0,
+                 rate_limit: float = 0.0, burst: float = 10.0, retry_after: Optional[float] = None,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            latency: Median response latency in seconds
+            latency_sigma: Spread of the log-normal latency distribution (0 for a fixed latency)
+            error_rate: Fraction of requests answered with a 500 or 503
+            rate_limit: Requests per second allowed per API key before answering 429 (0 disables)
+            burst: Requests per key allowed back to back before ``rate_limit`` applies
+            retry_after: Retry-After sent with a 429 (defaults to the time until a request is allowed)
+            seed: Seed for the latency and error draws, for reproducible runs
+        """
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def draw_latency(self) -> float:
+        with self._lock:
+            if self.latency <= 0:
+                return 0.0
+            if self.latency_sigma <= 0:
+                return self.latency
+            return self.latency * self._random.lognormvariate(0, self.latency_sigma)
+
+    def draw_error(self) -> Optional[int]:
+        with self._lock:
+            if self._random.random() < self.error_rate:
+                return self._random.choice([500, 503])
+            return None
+
+    def throttle(self, api_key: str) -> Optional[float]:
+        """
+        Take a request slot for the key and return the Retry-After if it has none left
+        """
+        if self.rate_limit <= 0:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(api_key)
+            if bucket is None:
+                bucket = self._buckets[api_key] = TokenBucket(self.rate_limit, self.burst)
+            now = time.monotonic()
+            headroom = bucket.headroom(now)
+            if headroom < 1:
+                return self.retry_after if self.retry_after is not None else (1 - headroom) / self.rate_limit
+            bucket.reserve(now)
+            return None
+
+
+class MockSolscanServer(ThreadingHTTPServer):
+    """
+    Local stand-in for public-api.solscan.io serving synthetic data
+
+    Point a scraper at it with ``base_url`` (or SOLSCAN_BASE_URL) to measure
+    throughput and tail latency without spending API quota. Any non-empty
+    ``token`` header is accepted as an API key.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], data: Optional[SyntheticData] = None,
+                 faults: Optional[FaultProfile] = None):
+        super().__init__(address, MockSolscanHandler)
+        self.data = data or SyntheticData()
+        self.faults = faults or FaultProfile()
+        self.status_counts: Dict[int, int] = {}
+        self.endpoint_counts: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, endpoint: str, status: int):
+        with self._stats_lock:
+            self.endpoint_counts[endpoint] = self.endpoint_counts.get(endpoint, 0) + 1
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+
+class MockSolscanHandler(BaseHTTPRequestHandler):
+    # Keep connections open so clients can reuse them, like the real API
+    protocol_version = 'HTTP/1.1'
+    server: MockSolscanServer
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        endpoint, handler = self._route(url.path)
+
+        time.sleep(self.server.faults.draw_latency())
+        api_key = self.headers.get('token')
+        if not api_key:
+            return self._reply(endpoint, 403, {'error': 'Missing API key'})
+        retry_after = self.server.faults.throttle(api_key)
+        if retry_after is not None:
+            return self._reply(endpoint, 429, {'error': 'Too many requests'},
+                               {'Retry-After': f"{retry_after:.2f}", 'X-RateLimit-Remaining': '0'})
+        if handler is None:
+            return self._reply(endpoint, 404, {'error': f'Unknown endpoint {url.path}'})
+        error = self.server.faults.draw_error()
+        if error is not None:
+            return self._reply(endpoint, error, {'error': 'Internal server error'})
+        try:
+            body = handler(params)
+        except (KeyError, ValueError) as e:
+            return self._reply(endpoint, 400, {'error': f'Bad request: {str(e)}'})
+        self._reply(endpoint, 200, body)
+
+    def _route(self, path: str):
+        data = self.server.data
+        routes = {
+            '/transaction/last': lambda p: data.recent_transactions(int(p.get('limit', 10))),
+            '/token/list': lambda p: data.token_list(int(p.get('offset', 0)), int(p.get('limit', 10))),
+            '/token/holders': lambda p: data.token_holders(p['tokenAddress'], int(p.get('offset', 0)),
+                                                           int(p.get('limit', 10))),
+            '/account/transactions': lambda p: data.account_transactions(p['account'], int(p.get('limit', 10)),
+                                                                         p.get('beforeHash')),
+            '/account/tokens': lambda p: data.account_tokens(p['account']),
+        }
+        if path in routes:
+            return path, routes[path]
+        match = re.fullmatch(r'/account/([1-9A-HJ-NP-Za-km-z]+)', path)
+        if match:
+            return '/account/{address}', lambda p: data.account(match.group(1))
+        return path, None
+
+    def _reply(self, endpoint: str, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode('utf-8')
+        etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, payload = 304, b''
+        self.server.count(endpoint, status)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if status in (200, 304):
+            self.send_header('ETag', etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # One line per request would drown out the scraper's own output
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve synthetic Solscan API responses for offline load testing')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=0.05, help='Median response latency in seconds')
+    parser.add_argument('--latency_sigma', type=float, default=0.5,
+                        help='Spread of the log-normal latency distribution (0 for a fixed latency)')
+    parser.add_argument('--error_rate', type=float, default=0.0,
+                        help='Fraction of requests answered with a 500 or 503')
+    parser.add_argument('--rate_limit', type=float, default=0.0,
+                        help='Requests per second allowed per API key before answering 429 (0 disables)')
+    parser.add_argument('--burst', type=float, default=10.0,
+                        help='Requests per key allowed back to back before --rate_limit applies')
+    parser.add_argument('--token_count', type=int, default=500, help='Number of tokens in /token/list')
+    parser.add_argument('--holders_per_token', type=int, default=1000, help='Number of holders per token')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic data and fault draws')
+    args = parser.parse_args()
+
+    data = SyntheticData(args.seed, args.token_count, args.holders_per_token)
+    faults = FaultProfile(args.latency, args.latency_sigma, args.error_rate, args.rate_limit, args.burst,
+                          seed=args.seed)
+    server = MockSolscanServer((args.host, args.port), data, faults)
+    print(f"Mock Solscan API listening on {server.base_url}")
+    print(f"Run the scraper against it with SOLSCAN_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nServed {sum(server.endpoint_counts.values())} requests")
+        for endpoint, count in sorted(server.endpoint_counts.items()):
+            print(f"- {endpoint}: {count}")
+        print(f"- Statuses: {', '.join(f'{status}: {count}' for status, count in sorted(server.status_counts.items()))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# From Python 3.12 cProfile is built on sys.monitoring: one enabled profiler
+# sees every thread, and enabling a second one raises ValueError
+PROFILER_COVERS_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class PhaseProfiler:
+    """
+    Profile named phases of a run with cProfile and write one report per phase
+
+    A phase may be entered many times (e.g. once per scraped page); its
+    profile and wall time accumulate. Phases entered inside another phase
+    pause the outer one, so every phase's figures exclude its nested phases.
+    Before Python 3.12 cProfile only sees the thread that enables it, so tasks
+    handed to worker threads are wrapped with ``bind()`` to have them counted
+    towards the phase they were submitted in; from 3.12 the phase's own
+    profiler already covers them.
+
+    Created without a directory the profiler is disabled and every method
+    is a no-op.
+    """
+
+    def __init__(self, directory: Optional[str] = None, top: int = 30):
+        """
+        Args:
+            directory: Directory to write the reports to (created if missing), or None to disable
+            top: Number of functions listed per phase, by cumulative time
+        """
+        self.directory = directory
+        self.top = top
+        self._profiles: Dict[str, List[cProfile.Profile]] = {}
+        self._wall_times: Dict[str, float] = {}
+        # Phases entered on the owner thread, innermost last: (name, profile, started)
+        self._stack: List[Tuple[str, cProfile.Profile, float]] = []
+        self._owner: Optional[int] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _profile_for(self, name: str) -> cProfile.Profile:
+        with self._lock:
+            profiles = self._profiles.setdefault(name, [])
+            if not profiles:
+                profiles.append(cProfile.Profile())
+            return profiles[0]
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Profile the enclosed block as (part of) the phase ``name``
+        """
+        if not self.enabled:
+            yield
+            return
+        now = time.perf_counter()
+        if self._stack:
+            outer, outer_profile, outer_started = self._stack[-1]
+            outer_profile.disable()
+            self._wall_times[outer] = self._wall_times.get(outer, 0.0) + now - outer_started
+        self._owner = threading.get_ident()
+        profile = self._profile_for(name)
+        self._stack.append((name, profile, now))
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            now = time.perf_counter()
+            _, _, started = self._stack.pop()
+            self._wall_times[name] = self._wall_times.get(name, 0.0) + now - started
+            if self._stack:
+                outer, outer_profile, _ = self._stack[-1]
+                self._stack[-1] = (outer, outer_profile, now)
+                outer_profile.enable()
+
+    def current_phase(self) -> Optional[str]:
+        """
+        Name of the phase the calling thread's work counts towards, if any
+        """
+        if threading.get_ident() == self._owner:
+            return self._stack[-1][0] if self._stack else None
+        return getattr(self._local, 'phase', None)
+
+    @contextmanager
+    def worker(self, name: Optional[str]) -> Iterator[None]:
+        """
+        Count a task run on a worker thread towards the phase ``name``
+
+        ``name`` must be taken when the task is submitted (``bind()`` does
+        that): by the time a worker starts on it the owner thread may have
+        entered another phase.
+        """
+        outer = getattr(self._local, 'phase', None)
+        if name is None or name == outer or threading.get_ident() == self._owner or PROFILER_COVERS_ALL_THREADS:
+            yield
+            return
+        profile = getattr(self._local, 'profiles', {}).get(name)
+        if profile is None:
+            profile = cProfile.Profile()
+            self._local.profiles = {**getattr(self._local, 'profiles', {}), name: profile}
+            with self._lock:
+                self._profiles.setdefault(name, []).append(profile)
+        # A task of another phase run from inside this one pauses it, as phases do on the owner thread
+        if outer is not None:
+            self._local.profiles[outer].disable()
+        self._local.phase = name
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._local.phase = outer
+            if outer is not None:
+                self._local.profiles[outer].enable()
+
+    def bind(self, task: Callable[..., T]) -> Callable[..., T]:
+        """
+        Wrap a task about to be submitted to a worker thread so it counts towards the current phase
+        """
+        name = self.current_phase()
+        if name is None or PROFILER_COVERS_ALL_THREADS:
+            return task
+
+        @functools.wraps(task)
+        def run(*args, **kwargs) -> T:
+            with self.worker(name):
+                return task(*args, **kwargs)
+        return run
+
+    def write_reports(self) -> Optional[str]:
+        """
+        Write a .prof file per phase (for pstats, snakeviz etc.) and a combined text report
+
+        Returns the path of the text report, or None when profiling is disabled.
+        """
+        if not self.enabled:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        report_path = os.path.join(self.directory, 'report.txt')
+        with open(report_path, 'w') as report:
+            for name, profiles in self._profiles.items():
+                for profile in profiles:
+                    profile.create_stats()
+                # pstats refuses profiles that recorded nothing
+                profiles = [profile for profile in profiles if profile.stats]
+                if not profiles:
+                    continue
+                stats = pstats.Stats(profiles[0], stream=io.StringIO())
+                for profile in profiles[1:]:
+                    stats.add(profile)
+                stats.dump_stats(os.path.join(self.directory, f'{name}.prof'))
+
+                wall_time = self._wall_times.get(name, 0.0)
+                logger.info("- Phase %s: %.2fs wall time, %d profiles merged", name, wall_time, len(profiles))
+                output = io.StringIO()
+                stats.stream = output
+                stats.sort_stats('cumulative').print_stats(self.top)
+                report.write(f"=== Phase {name}: {wall_time:.2f}s wall time, {len(profiles)} profiles merged ===\n")
+                report.write(output.getvalue())
+                report.write('\n')
+        return report_path
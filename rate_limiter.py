@@ -0,0 +1,222 @@
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+# Header names the API may use to report remaining quota
+REMAINING_HEADERS = ('X-RateLimit-Remaining', 'RateLimit-Remaining')
+RESET_HEADERS = ('X-RateLimit-Reset', 'RateLimit-Reset')
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations
+
+    Each reservation consumes one token. When the bucket is empty the token
+    count goes negative and the caller is told how long to wait for its turn,
+    so concurrent callers queue up fairly instead of polling.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, now: float) -> float:
+        """
+        Take one token and return the number of seconds to wait before using it
+        """
+        self._refill(now)
+        self.tokens -= 1
+        delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(delay, self.blocked_until - now)
+
+    def release(self):
+        """
+        Return the token of a reservation that will not be used
+        """
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def headroom(self, now: float) -> float:
+        """
+        Tokens available right now; negative when callers are queued or the bucket is paused
+        """
+        self._refill(now)
+        if self.blocked_until > now:
+            return min(self.tokens, 0.0) - (self.blocked_until - now) * self.rate
+        return self.tokens
+
+    def pause_until(self, until: float):
+        """
+        Hand out no tokens before the given monotonic time and drain the bucket
+        """
+        self.blocked_until = max(self.blocked_until, until)
+        self.tokens = min(self.tokens, 0.0)
+
+
+class RateLimiter:
+    """
+    Shared token-bucket rate limiter, configurable per endpoint
+
+    Endpoints without their own rate share the default bucket. The limiter also
+    backs off when the API answers 429 (honouring Retry-After) or reports that
+    its remaining quota is exhausted.
+    """
+
+    def __init__(self, requests_per_second: float = 3.0, burst: float = 3.0,
+                 endpoint_rates: Optional[Dict[str, float]] = None,
+                 default_backoff: float = 5.0):
+        """
+        Args:
+            requests_per_second: Rate of the shared default bucket
+            burst: Bucket capacity, i.e. how many requests may go out back to back
+            endpoint_rates: Requests per second for endpoints that get their own bucket
+            default_backoff: Seconds to back off on a 429 without a usable Retry-After
+        """
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.endpoint_rates = dict(endpoint_rates or {})
+        self.default_backoff = default_backoff
+        self._lock = threading.Lock()
+        self._default = TokenBucket(requests_per_second, burst)
+        self._buckets = {
+            endpoint: TokenBucket(rate, burst)
+            for endpoint, rate in self.endpoint_rates.items()
+        }
+        self.throttled_count = 0
+        self.remaining_quota: Optional[int] = None
+
+    def clone(self) -> 'RateLimiter':
+        """
+        Create a limiter with the same configuration and fresh buckets
+        """
+        return RateLimiter(self.requests_per_second, self.burst, self.endpoint_rates, self.default_backoff)
+
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        return self._buckets.get(endpoint, self._default)
+
+    def reserve(self, endpoint: str) -> float:
+        """
+        Reserve a request slot for an endpoint and return the seconds to wait for it
+        """
+        with self._lock:
+            return self._bucket(endpoint).reserve(time.monotonic())
+
+    def release(self, endpoint: str):
+        """
+        Give back a reserved request slot that will not be used
+        """
+        with self._lock:
+            self._bucket(endpoint).release()
+
+    def headroom(self, endpoint: str) -> float:
+        """
+        How many requests to the endpoint could go out right now, also bounded by
+        the quota the API last reported as remaining
+        """
+        with self._lock:
+            headroom = self._bucket(endpoint).headroom(time.monotonic())
+            if self.remaining_quota is not None:
+                headroom = min(headroom, self.remaining_quota)
+            return headroom
+
+    def acquire(self, endpoint: str):
+        """
+        Block until a request to the endpoint is allowed
+        """
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, endpoint: str):
+        """
+        Wait without blocking the event loop until a request to the endpoint is allowed
+        """
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def update_from_response(self, endpoint: str, status: int, headers: Mapping[str, str]) -> Optional[float]:
+        """
+        Adjust the endpoint's bucket from a response's status and rate-limit headers
+
+        Returns the back-off in seconds when the response was a 429, otherwise None.
+        """
+        now = time.monotonic()
+        remaining = _first_header(headers, REMAINING_HEADERS)
+        reset = _parse_reset(_first_header(headers, RESET_HEADERS))
+
+        with self._lock:
+            bucket = self._bucket(endpoint)
+            if remaining is not None:
+                try:
+                    self.remaining_quota = int(remaining)
+                except ValueError:
+                    pass
+                else:
+                    if self.remaining_quota <= 0 and reset is not None:
+                        bucket.pause_until(now + reset)
+
+            if status != 429:
+                return None
+
+            self.throttled_count += 1
+            backoff = _parse_retry_after(headers.get('Retry-After'))
+            if backoff is None:
+                backoff = reset if reset is not None else self.default_backoff
+            bucket.pause_until(now + backoff)
+            return backoff
+
+
+def _first_header(headers: Mapping[str, str], names) -> Optional[str]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given either as delay seconds or as an HTTP date
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a rate-limit reset header into seconds from now
+
+    Values that look like a Unix timestamp are treated as absolute times,
+    anything smaller as a delay in seconds.
+    """
+    if value is None:
+        return None
+    try:
+        reset = float(value)
+    except ValueError:
+        return None
+    if reset > 1e9:
+        reset -= time.time()
+    return max(reset, 0.0)
@@ -0,0 +1,170 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+# Default time-to-live in seconds per endpoint; 0 disables caching for that endpoint
+DEFAULT_TTLS = {
+    '/token/list': 6 * 3600,
+    '/token/holders': 3600,
+    '/account/{address}': 3600,
+    '/account/tokens': 3600,
+    '/account/transactions': 300,
+    '/transaction/last': 0,
+}
+
+
+class ResponseCache:
+    """
+    Persistent SQLite-backed cache of API response bodies
+
+    Entries are keyed by path + normalized query parameters and expire after a
+    per-endpoint TTL. Expired entries that carry an ETag or Last-Modified
+    validator are kept so they can be revalidated with a conditional request.
+    When the cache grows past ``max_entries`` the least recently used entries
+    are evicted.
+    """
+
+    def __init__(self, path: str = 'solscan_cache.sqlite', ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = 600, max_entries: int = 100_000):
+        """
+        Args:
+            path: SQLite database file
+            ttls: Per-endpoint TTLs in seconds, merged over DEFAULT_TTLS
+            default_ttl: TTL for endpoints without an entry in ``ttls``
+            max_entries: Maximum number of cached responses kept on disk
+        """
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        self._writes_since_trim = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, endpoint TEXT, body BLOB, stored_at REAL, accessed_at REAL, '
+            'etag TEXT, last_modified TEXT)'
+        )
+        # Databases created before validators were stored lack these columns
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(responses)')}
+        for column in ('etag', 'last_modified'):
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE responses ADD COLUMN {column} TEXT')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(path: str, params: Optional[Dict] = None) -> str:
+        """
+        Build a cache key from an API path and its query parameters, independent of parameter order
+        """
+        if not params:
+            return path
+        return f"{path}?{urlencode(sorted((k, str(v)) for k, v in params.items()))}"
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, endpoint: str, key: str) -> Optional[bytes]:
+        """
+        Return the cached body for a key, or None if it is missing or expired
+        """
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT body, stored_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[1] > ttl:
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def get_validators(self, key: str) -> Optional[Tuple[bytes, Optional[str], Optional[str]]]:
+        """
+        Return (body, etag, last_modified) of a stored entry that has a validator, fresh or not
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT body, etag, last_modified FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None or (row[1] is None and row[2] is None):
+            return None
+        return row
+
+    def revalidated(self, key: str):
+        """
+        Mark a stored entry as fresh again after the API answered 304 Not Modified
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute('UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?', (now, now, key))
+            self._conn.commit()
+            self.revalidations += 1
+
+    def set(self, endpoint: str, key: str, body: bytes, etag: Optional[str] = None,
+            last_modified: Optional[str] = None):
+        """
+        Store a response body and its validators, evicting the least recently used
+        entries if the cache is full
+
+        Bodies from endpoints with a TTL of 0 are only kept when they carry a
+        validator, since they can then be revalidated cheaply.
+        """
+        if self.ttl_for(endpoint) <= 0 and etag is None and last_modified is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, endpoint, body, stored_at, accessed_at, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, endpoint, body, now, now, etag, last_modified)
+            )
+            self._writes_since_trim += 1
+            # Counting rows is not free, so only check the size every so often
+            if self._writes_since_trim >= 100:
+                self._trim()
+            self._conn.commit()
+
+    def _trim(self):
+        self._writes_since_trim = 0
+        count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM responses WHERE key IN '
+                '(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)', (excess,)
+            )
+            self.evictions += excess
+
+    def stats(self) -> Dict:
+        """
+        Report hit/miss counts and the current number of cached entries
+        """
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'evictions': self.evictions,
+            'revalidations': self.revalidations,
+        }
+
+    def close(self):
+        with self._lock:
+            self._trim()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,39 @@
+import random
+from typing import Iterable
+
+# Statuses worth retrying: throttling and transient server-side failures
+DEFAULT_RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class RetryPolicy:
+    """
+    Retry policy for transient request failures
+
+    Delays use exponential backoff with full jitter: before retry ``n`` the
+    caller waits a random time between 0 and min(cap, base * 2**n) seconds.
+    """
+
+    def __init__(self, max_attempts: int = 4, backoff_base: float = 0.5, backoff_cap: float = 30.0,
+                 retryable_statuses: Iterable[int] = DEFAULT_RETRYABLE_STATUSES):
+        """
+        Args:
+            max_attempts: Total attempts per request, including the first one
+            backoff_base: Backoff ceiling in seconds before the first retry
+            backoff_cap: Upper bound in seconds for any single backoff
+            retryable_statuses: HTTP statuses that trigger a retry
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retryable_statuses = frozenset(retryable_statuses)
+
+    def is_retryable_status(self, status: int) -> bool:
+        return status in self.retryable_statuses
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Seconds to wait after the given (0-based) failed attempt
+        """
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
@@ -1,337 +1,1354 @@
+import argparse
+import asyncio
+import csv
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import json
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Set
+from typing import Any, Callable, Iterator, List, Dict, NamedTuple, Optional, Set, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+import threading
 import os
+import logging
 from dotenv import load_dotenv
 
+from circuit_breaker import OPEN, CircuitBreakerRegistry, CircuitOpenError
+from deadline import DeadlineExceeded, current_deadline, deadline
+from http2_adapter import HTTP2Adapter
+from key_pool import APIKeyPool, PooledKey
+from metrics import Metrics, MetricsServer
+from profiling import PhaseProfiler
+from json_decoding import JSONDecoder
+from key_validation import VALIDATION_ENDPOINTS, ValidationCache
+from logging_config import LOG_LEVELS, ThroughputReporter, configure_logging
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from retry_policy import RetryPolicy
+from singleflight import SingleFlight
+from tracing import Tracer, set_tracer, span
+from traffic_archive import RecordingAdapter, ReplayAdapter
+from ttl_lru_cache import TTLLRUCache
+
+DEFAULT_BASE_URL = "https://public-api.solscan.io"
+
+logger = logging.getLogger(__name__)
+
+# Errors a get_* method reports and recovers from by returning an empty result
+REQUEST_ERRORS = (requests.exceptions.RequestException, CircuitOpenError)
+
+
+class LookupFailedError(Exception):
+    """
+    Raised for a wallet whose lookups still failed after every retry, so it is
+    recorded as an error instead of being scored on missing data
+    """
+
+
+def endpoint_key(path: str) -> str:
+    """
+    Map an API path to the endpoint it belongs to, e.g. '/account/<addr>' -> '/account/{address}'
+    """
+    if path.startswith('/account/') and path not in ('/account/transactions', '/account/tokens'):
+        return '/account/{address}'
+    return path
+
+
+def conditional_headers(stored: Optional[Tuple[bytes, Optional[str], Optional[str]]]) -> Optional[Dict]:
+    """
+    Build If-None-Match / If-Modified-Since headers from a cached entry's validators
+    """
+    if stored is None:
+        return None
+    _, etag, last_modified = stored
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
 class SolscanScraper:
-    def __init__(self):
+    def __init__(self, pool_size: int = 10, keep_alive: bool = True,
+                 timeout: float = 30.0, connect_timeout: float = 5.0, request_timeout: float = 60.0,
+                 rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 cache: Optional[ResponseCache] = None, memo_size: int = 10_000, memo_ttl: float = 600,
+                 lazy_validation: bool = True, validation_cache: Optional[ValidationCache] = None,
+                 json_backend: str = 'auto', breakers: Optional[CircuitBreakerRegistry] = None,
+                 http2: bool = False, key_pool: Optional[APIKeyPool] = None,
+                 base_url: Optional[str] = None, record_dir: Optional[str] = None,
+                 replay_dir: Optional[str] = None, metrics: Optional[Metrics] = None,
+                 profiler: Optional[PhaseProfiler] = None):
+        """
+        Args:
+            pool_size: Maximum number of pooled connections kept open to the API host
+            keep_alive: Reuse connections between requests (sends 'Connection: close' when False)
+            timeout: Read timeout in seconds for each socket read
+            connect_timeout: Connect timeout in seconds for each request
+            request_timeout: Hard limit in seconds on each request, including reading the body
+            rate_limiter: Limiter for each API key; further keys get copies (defaults to a RateLimiter())
+            retry_policy: Retries for transient failures (defaults to a RetryPolicy())
+            cache: Optional on-disk response cache consulted before every request
+            memo_size: Maximum number of account lookups memoized in memory (0 disables)
+            memo_ttl: Seconds a memoized account lookup stays valid
+            lazy_validation: Defer API key validation to the first real request
+            validation_cache: Remembers validated keys on disk (defaults to a ValidationCache())
+            json_backend: JSON decoder for response bodies: 'auto', 'orjson', 'msgspec' or 'json'
+            breakers: Per-endpoint circuit breakers (defaults to a CircuitBreakerRegistry())
+            http2: Multiplex requests over one HTTP/2 connection with httpx instead of a socket pool
+            key_pool: API keys to spread requests over (defaults to the keys in
+                SOLSCAN_API_KEYS or SOLSCAN_API_KEY, each limited like ``rate_limiter``)
+            base_url: API root (defaults to SOLSCAN_BASE_URL or the public Solscan API),
+                e.g. a local mock_solscan_server
+            record_dir: Record every response to a compressed archive in this directory
+            replay_dir: Answer requests from the archive in this directory instead of the network
+            metrics: Per-endpoint request metrics (defaults to a Metrics())
+            profiler: Counts work handed to background threads towards the phase it
+                was started in (defaults to a disabled PhaseProfiler())
+        """
         load_dotenv()
-        self.base_url = "https://public-api.solscan.io"
-        self.api_key = os.getenv('SOLSCAN_API_KEY')
-        if not self.api_key:
-            raise ValueError("SOLSCAN_API_KEY not found in .env file")
+        self.base_url = (base_url or os.getenv('SOLSCAN_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.key_pool = key_pool or APIKeyPool.from_env(rate_limiter)
         self.headers = {
-            'token': self.api_key,
             'Accept': 'application/json',
         }
-        # Validate API key
-        self._validate_api_key()
+        if not keep_alive:
+            self.headers['Connection'] = 'close'
+        self.timeout = (connect_timeout, timeout)
+        self.request_timeout = request_timeout
+        self.session = self._create_session(pool_size, http2, record_dir, replay_dir)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.decoder = JSONDecoder(json_backend)
+        # Account lookups repeated within a run are served from memory
+        self.account_memo = TTLLRUCache(memo_size, memo_ttl)
+        self.request_count = 0
+        self.retry_count = 0
+        self._stats_lock = threading.Lock()
+        self.metrics = metrics or Metrics()
+        self.profiler = profiler or PhaseProfiler()
+        self.inflight = SingleFlight()
+        self.breakers = breakers or CircuitBreakerRegistry()
+        # Addresses whose lookups were skipped by an open circuit, to be retried later
+        self.deferred_addresses: Set[str] = set()
+        # Addresses with a lookup that failed after every retry
+        self.failed_addresses: Set[str] = set()
+        self.validation_cache = validation_cache or ValidationCache()
+        self._validated = False
+        self._validation_lock = threading.Lock()
+        if not lazy_validation:
+            self._ensure_validated()
         self.discovered_addresses = set()
 
-    def _validate_api_key(self):
+    def _create_session(self, pool_size: int, http2: bool = False, record_dir: Optional[str] = None,
+                        replay_dir: Optional[str] = None) -> requests.Session:
+        """
+        Create a connection-pooled session shared by every API call
+        """
+        session = requests.Session()
+        session.headers.update(self.headers)
+        if replay_dir:
+            adapter = ReplayAdapter(replay_dir)
+        elif http2:
+            adapter = HTTP2Adapter(max_connections=pool_size)
+        else:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        if record_dir and not replay_dir:
+            adapter = RecordingAdapter(adapter, record_dir)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _send(self, path: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+              key: Optional[PooledKey] = None) -> requests.Response:
         """
-        Validate the API key by making a test request
+        Send a GET request for an API path over the pooled session
+
+        Each attempt is sent with the API key that has the most headroom (or
+        with ``key`` if given), after waiting for that key's rate limiter.
+        Connection errors, timeouts and retryable statuses are retried according
+        to the retry policy; the backoff only delays this caller, not other
+        workers. After a 429, or a 403 that benched a key, the retry goes out
+        without backoff since the key pool itself holds back the affected key;
+        moving to another key this way does not use up one of the attempts,
+        until every key has been tried.
+
+        Every attempt is bounded by ``request_timeout`` and, when the caller runs
+        under a deadline, by the time left before it; DeadlineExceeded is raised
+        once that runs out, or before waiting on a rate limiter that would not
+        free a slot in time.
         """
-        # Try different endpoints for validation
-        test_endpoints = [
-            '/transaction/last',
-            '/token/list',
-            '/account/tokens'
-        ]
-        
-        for endpoint in test_endpoints:
+        endpoint = endpoint_key(path)
+        policy = self.retry_policy
+        budget = current_deadline()
+        attempt = 0
+        key_switches = 0
+        while True:
+            last_attempt = attempt == policy.max_attempts - 1
+            switch_key = False
+            with span('rate_limit', endpoint=endpoint):
+                pooled = self.key_pool.acquire(endpoint, key, budget)
+            timeout = self.timeout
+            hard_limit = time.monotonic() + self.request_timeout
+            if budget is not None:
+                timeout = (budget.clamp(self.timeout[0]), budget.clamp(self.timeout[1]))
+                hard_limit = min(hard_limit, budget.expires_at)
+            with self._stats_lock:
+                self.request_count += 1
+            self.metrics.request_started(endpoint)
+            started = time.perf_counter()
             try:
-                url = f"{self.base_url}{endpoint}"
-                print(f"Trying to validate API key with endpoint: {url}")
-                response = requests.get(url, headers=self.headers)
-                
-                if response.status_code == 200:
-                    print("API key validated successfully!")
-                    return
-                elif response.status_code == 403:
-                    print(f"Access denied for endpoint {endpoint}. Trying next endpoint...")
+                with span('request', endpoint=endpoint, attempt=attempt + 1) as request_span:
+                    response = self.session.get(f"{self.base_url}{path}", params=params,
+                                                headers={**(headers or {}), 'token': pooled.key},
+                                                timeout=timeout, stream=True)
+                    self._read_body(response, hard_limit)
+                    request_span.set(status=response.status_code, bytes=len(response.content))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.metrics.request_finished(endpoint, None, time.perf_counter() - started)
+                if budget is not None and budget.remaining() <= 0:
+                    # Cut short by the caller's deadline rather than failed by the endpoint
+                    raise DeadlineExceeded(f"Request to {endpoint} exceeded its {budget.budget:.0f}s budget") from e
+                if last_attempt:
+                    raise
+                delay = policy.backoff(attempt)
+                logger.warning("Error requesting %s: %s. Retrying in %.1fs", endpoint, e, delay)
+            except BaseException:
+                self.metrics.request_finished(endpoint, None, time.perf_counter() - started)
+                raise
+            else:
+                self.metrics.request_finished(endpoint, response.status_code, time.perf_counter() - started,
+                                              len(response.content))
+                throttle = self.key_pool.update_from_response(pooled, endpoint, response.status_code,
+                                                              response.headers, pinned=key is not None)
+                # A benched key's request moves to another key, unless the key was pinned or all were tried
+                switch_key = throttle is not None and key is None and key_switches < len(self.key_pool.keys) - 1
+                retryable = policy.is_retryable_status(response.status_code) or switch_key
+                if not retryable or (last_attempt and not switch_key):
+                    return response
+                if throttle is not None:
+                    delay = 0.0
+                    logger.warning("Status %d from %s, backing off key %s for %.1fs",
+                                   response.status_code, endpoint, pooled.name, throttle)
                 else:
-                    print(f"Unexpected status code {response.status_code} for endpoint {endpoint}")
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"Error with endpoint {endpoint}: {str(e)}")
+                    delay = policy.backoff(attempt)
+                    logger.warning("Status %d from %s, retrying in %.1fs", response.status_code, endpoint, delay)
+
+            with self._stats_lock:
+                self.retry_count += 1
+            self.metrics.retried(endpoint)
+            if budget is not None:
+                delay = min(delay, max(budget.remaining(), 0.0))
+            if delay > 0:
+                with span('backoff', endpoint=endpoint):
+                    time.sleep(delay)
+            if budget is not None:
+                budget.check(f"Request to {endpoint}")
+            if switch_key:
+                key_switches += 1
+            else:
+                attempt += 1
+
+    @staticmethod
+    def _read_body(response: requests.Response, hard_limit: float):
+        """
+        Read a streamed response body, giving up once the monotonic ``hard_limit`` passes
+
+        The read timeout only bounds each socket read, so a server trickling
+        bytes could otherwise hold a request open indefinitely.
+        """
+        chunks = []
+        try:
+            for chunk in response.iter_content(64 * 1024):
+                chunks.append(chunk)
+                if time.monotonic() > hard_limit:
+                    raise requests.exceptions.Timeout(f"Reading the response from {response.url} took too long")
+        except BaseException:
+            response.close()
+            raise
+        response._content = b''.join(chunks)
+
+    def _get(self, path: str, params: Optional[Dict] = None,
+             decode: Optional[Callable[[bytes], Any]] = None) -> Any:
+        """
+        Shared request path: serve from the response cache if possible, otherwise
+        send the request, raise on HTTP errors and decode the JSON body
+
+        Concurrent calls for the same path and parameters are coalesced into a
+        single request whose result every caller shares.
+
+        Args:
+            path: API path, e.g. '/account/tokens'
+            params: Query parameters
+            decode: Decoder for the response body (defaults to self.decoder.loads)
+        """
+        self._ensure_validated()
+        decode = decode or self.decoder.loads
+        endpoint = endpoint_key(path)
+        key = ResponseCache.make_key(path, params)
+        if self.cache is not None:
+            body = self.cache.get(endpoint, key)
+            if body is not None:
+                return self._decode(decode, body)
+
+        budget = current_deadline()
+        try:
+            return self.inflight.do((key, decode), lambda: self._fetch(path, params, endpoint, key, decode),
+                                    timeout=budget.remaining() if budget is not None else None)
+        except TimeoutError:
+            # Waiting on another caller's in-flight request ran past this caller's deadline
+            if budget is not None:
+                budget.check(f"Request to {endpoint}")
+            raise
+
+    @staticmethod
+    def _decode(decode: Callable[[bytes], Any], body: bytes) -> Any:
+        try:
+            with span('decode', bytes=len(body)):
+                return decode(body)
+        except ValueError as e:
+            raise requests.exceptions.InvalidJSONError(f"Could not decode response body: {str(e)}")
+
+    def _fetch(self, path: str, params: Optional[Dict], endpoint: str, key: str,
+               decode: Callable[[bytes], Any]) -> Any:
+        """
+        Fetch a response from the API, store it in the response cache and decode it
+
+        Fails fast with CircuitOpenError while the endpoint's circuit is open.
+        When the cache holds a copy with an ETag or Last-Modified validator the
+        request is made conditional, and a 304 answer is served from that copy.
+        """
+        breaker = self.breakers.get(endpoint)
+        breaker.before_call()
+        stored = self.cache.get_validators(key) if self.cache is not None else None
+        try:
+            response = self._send(path, params, conditional_headers(stored))
+        except requests.exceptions.RequestException:
+            # Only the endpoint's own failures count; a wallet running out of budget is not one
+            breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        if response.status_code == 304 and stored is not None:
+            self.cache.revalidated(key)
+            return self._decode(decode, stored[0])
+
+        response.raise_for_status()
+        if self.cache is not None:
+            self.cache.set(endpoint, key, response.content,
+                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return self._decode(decode, response.content)
+
+    def _defer(self, address: str):
+        with self._stats_lock:
+            self.deferred_addresses.add(address)
+
+    def take_deferred(self, address: str) -> bool:
+        """
+        Return True (and forget it) if a lookup for the address was skipped by an open circuit
+        """
+        with self._stats_lock:
+            if address in self.deferred_addresses:
+                self.deferred_addresses.discard(address)
+                return True
+            return False
+
+    def _fail(self, address: str):
+        with self._stats_lock:
+            self.failed_addresses.add(address)
+
+    def take_failed(self, address: str) -> bool:
+        """
+        Return True (and forget it) if a lookup for the address failed after every retry
+        """
+        with self._stats_lock:
+            if address in self.failed_addresses:
+                self.failed_addresses.discard(address)
+                return True
+            return False
+
+    def get_connection_stats(self) -> Dict:
+        """
+        Report how many requests were sent and how many of them reused a pooled connection
+        """
+        opened = 0
+        # The same adapter is mounted for http:// and https://
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+        for adapter in adapters.values():
+            if isinstance(adapter, RecordingAdapter):
+                adapter = adapter.adapter
+            if isinstance(adapter, HTTP2Adapter):
+                opened += adapter.connections_opened
+                continue
+            if not isinstance(adapter, HTTPAdapter):
                 continue
-        
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+        return {
+            'requests': self.request_count,
+            'connections_opened': opened,
+            'connections_reused': max(self.request_count - opened, 0),
+        }
+
+    def close(self):
+        """
+        Close the pooled session and its connections
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _ensure_validated(self):
+        """
+        Validate the API keys once, before the first request that needs them
+
+        Keys that fail validation are dropped from the pool; ValueError is
+        raised only if none is left.
+        """
+        if self._validated:
+            return
+        with self._validation_lock:
+            if not self._validated:
+                invalid = []
+                for pooled in self.key_pool.keys:
+                    if self.validation_cache.is_valid(pooled.key):
+                        logger.info("API key %s validated recently, skipping validation", pooled.name)
+                        continue
+                    try:
+                        self._validate_api_key(pooled)
+                    except ValueError as e:
+                        logger.error("Dropping API key %s: %s", pooled.name, e)
+                        invalid.append(pooled)
+                        continue
+                    self.validation_cache.remember(pooled.key)
+                self.key_pool.discard(invalid)
+                self._validated = True
+
+    def _validate_api_key(self, pooled: PooledKey):
+        """
+        Validate an API key by probing several endpoints concurrently
+        """
+        def probe(endpoint: str) -> int:
+            logger.info("Trying to validate API key %s with endpoint: %s%s", pooled.name, self.base_url, endpoint)
+            return self._send(endpoint, key=pooled).status_code
+
+        executor = ThreadPoolExecutor(max_workers=len(VALIDATION_ENDPOINTS))
+        try:
+            probe = self.profiler.bind(probe)
+            futures = {executor.submit(probe, endpoint): endpoint for endpoint in VALIDATION_ENDPOINTS}
+            for future in as_completed(futures):
+                endpoint = futures[future]
+                try:
+                    status_code = future.result()
+                except requests.exceptions.RequestException as e:
+                    logger.warning("Error with endpoint %s: %s", endpoint, e)
+                    continue
+
+                if status_code == 200:
+                    logger.info("API key validated successfully")
+                    return
+                elif status_code == 403:
+                    logger.warning("Access denied for endpoint %s", endpoint)
+                else:
+                    logger.warning("Unexpected status code %d for endpoint %s", status_code, endpoint)
+        finally:
+            # Don't wait for the remaining probes once one has succeeded
+            executor.shutdown(wait=False)
+
         raise ValueError("Could not validate API key with any endpoint. Please check your API key and try again.")
 
     def get_recent_transactions(self, limit: int = 100) -> List[Dict]:
         """
         Get recent transactions from Solscan
         """
-        endpoint = f"{self.base_url}/transaction/last"
         params = {'limit': limit}
         try:
-            response = requests.get(endpoint, headers=self.headers, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get('/transaction/last', params)
             if isinstance(data, dict) and 'error' in data:
-                print(f"API Error: {data['error']}")
+                logger.error("API error: %s", data['error'])
                 return []
             return data
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching recent transactions: {str(e)}")
+        except REQUEST_ERRORS as e:
+            logger.error("Error fetching recent transactions: %s", e)
             return []
 
-    def get_top_tokens(self, limit: int = 20) -> List[Dict]:
+    def get_top_tokens(self, limit: int = 20, offset: int = 0) -> List[Dict]:
         """
-        Get top Solana tokens by market cap
+        Get top Solana tokens by market cap, starting ``offset`` tokens down the list
         """
-        endpoint = f"{self.base_url}/token/list"
+        try:
+            return self._get_top_tokens_page(limit, offset)
+        except REQUEST_ERRORS as e:
+            logger.error("Error fetching top tokens: %s", e)
+            return []
+
+    def _get_top_tokens_page(self, limit: int, offset: int) -> List[Dict]:
         params = {'limit': limit, 'sortBy': 'marketCap', 'sortType': 'desc'}
+        if offset:
+            params['offset'] = offset
+        return self._get('/token/list', params)
+
+    def iter_top_tokens(self, page_size: int = 50) -> Iterator[Dict]:
+        """
+        Lazily walk the token list by market cap, page by page
+
+        The next page is prefetched in the background while the caller works
+        through the current one, so at most two pages are held in memory. The
+        walk ends at the first short page. A page skipped by an open circuit is
+        requested again once the circuit allows a trial call.
+
+        Raises:
+            requests.exceptions.RequestException: If a page cannot be fetched
+            CircuitOpenError: If the circuit is still open on the second try
+        """
+        def fetch_page(offset: int) -> List[Dict]:
+            try:
+                return self._get_top_tokens_page(page_size, offset)
+            except CircuitOpenError as e:
+                logger.warning("%s; requesting tokens from offset %d again", e, offset)
+                time.sleep(e.retry_in)
+                return self._get_top_tokens_page(page_size, offset)
+
+        prefetcher = ThreadPoolExecutor(max_workers=1)
+        offset = 0
+        next_page = prefetcher.submit(self.profiler.bind(fetch_page), offset)
         try:
-            response = requests.get(endpoint, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching top tokens: {str(e)}")
+            while next_page is not None:
+                page = next_page.result() or []
+                next_page = None
+                if len(page) >= page_size:
+                    offset += page_size
+                    next_page = prefetcher.submit(self.profiler.bind(fetch_page), offset)
+                yield from page
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+            prefetcher.shutdown(wait=False)
+
+    def get_token_holders(self, token_address: str, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """
+        Get the largest holders of a token, starting ``offset`` holders down the list
+        """
+        try:
+            return self._get_token_holders_page(token_address, limit, offset)
+        except REQUEST_ERRORS as e:
+            logger.warning("Error fetching holders for token %s: %s", token_address, e)
             return []
 
-    def discover_addresses(self, max_addresses: int = 1000) -> Set[str]:
+    def _get_token_holders_page(self, token_address: str, limit: int, offset: int) -> List[Dict]:
+        params = {'tokenAddress': token_address, 'limit': limit}
+        if offset:
+            params['offset'] = offset
+        return self._get('/token/holders', params)
+
+    def discover_addresses(self, max_addresses: int = 1000, concurrency: int = 8, page_size: int = 50) -> Set[str]:
         """
         Discover active wallet addresses by analyzing recent transactions and token holders
+
+        After the recent transactions, holder pages are crawled token by token
+        down the market-cap list, over ``concurrency`` threads paced by the shared
+        rate limiter, and merged as they arrive. Each token's holders are paged
+        through until they run out, then the next token is taken. Only as many
+        pages are kept in flight as the addresses still needed can use, and once
+        ``max_addresses`` are found the requests still queued are cancelled.
+        A holder page skipped by an open circuit waits for the circuit to allow
+        a trial call, and a page that fails is queued again, up to the retry
+        policy's ``max_attempts`` times, so a failure is never read as the end
+        of a token's holders.
         """
-        print("Starting address discovery...")
-        
-        # Get recent transactions
-        transactions = self.get_recent_transactions(limit=100)
-        for tx in transactions:
-            if len(self.discovered_addresses) >= max_addresses:
-                break
-                
-            # Extract addresses from transaction
-            if 'owner' in tx:
-                self.discovered_addresses.add(tx['owner'])
-            if 'signer' in tx:
-                self.discovered_addresses.add(tx['signer'])
-            if 'fromAddress' in tx:
-                self.discovered_addresses.add(tx['fromAddress'])
-            if 'toAddress' in tx:
-                self.discovered_addresses.add(tx['toAddress'])
-
-        # Get holders of top tokens
-        top_tokens = self.get_top_tokens()
-        for token in top_tokens:
-            if len(self.discovered_addresses) >= max_addresses:
-                break
-                
+        logger.info("Starting address discovery")
+
+        def needed() -> int:
+            return max_addresses - len(self.discovered_addresses)
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        tokens = self.iter_top_tokens(page_size)
+        # Holder pages in flight, and pages waiting for a free slot: (token, offset, failures so far)
+        pages: Dict[Future, Tuple[str, int, int]] = {}
+        continuations: List[Tuple[str, int, int]] = []
+
+        def has_capacity() -> bool:
+            return len(pages) < concurrency and len(pages) * page_size < needed()
+
+        def fetch_page(token_address: str, offset: int) -> List[Dict]:
             try:
-                # Get token holders
-                holders_endpoint = f"{self.base_url}/token/holders"
-                params = {'tokenAddress': token['address'], 'limit': 50}
-                response = requests.get(holders_endpoint, headers=self.headers, params=params)
-                response.raise_for_status()
-                holders = response.json()
-                
-                # Add holder addresses
-                for holder in holders:
-                    if len(self.discovered_addresses) >= max_addresses:
-                        break
-                    if 'owner' in holder:
-                        self.discovered_addresses.add(holder['owner'])
-                
-                time.sleep(1)  # Be nice to the API
-            except Exception as e:
-                print(f"Error fetching holders for token {token['address']}: {str(e)}")
-                continue
+                return self._get_token_holders_page(token_address, page_size, offset)
+            except CircuitOpenError as e:
+                time.sleep(e.retry_in)
+                return self._get_token_holders_page(token_address, page_size, offset)
+
+        def request(token_address: str, offset: int, failures: int = 0):
+            future = executor.submit(self.profiler.bind(fetch_page), token_address, offset)
+            pages[future] = (token_address, offset, failures)
+
+        def top_up():
+            while has_capacity():
+                if continuations:
+                    request(*continuations.pop())
+                    continue
+                try:
+                    token = next(tokens, None)
+                except REQUEST_ERRORS as e:
+                    # The walk ends with the failed page; carry on with the tokens listed so far
+                    logger.error("Error fetching top tokens, no further tokens will be crawled: %s", e)
+                    return
+                if token is None:
+                    return
+                if 'address' in token:
+                    request(token['address'], 0)
 
-        print(f"Discovered {len(self.discovered_addresses)} unique addresses")
+        try:
+            for tx in self.get_recent_transactions(limit=100) or []:
+                if needed() <= 0:
+                    break
+                for field in ('owner', 'signer', 'fromAddress', 'toAddress'):
+                    if field in tx:
+                        self.discovered_addresses.add(tx[field])
+
+            top_up()
+            while pages and needed() > 0:
+                done, _ = wait(pages, return_when=FIRST_COMPLETED)
+                for future in done:
+                    token_address, offset, failures = pages.pop(future)
+                    try:
+                        holders = future.result()
+                    except REQUEST_ERRORS as e:
+                        failures += 1
+                        if failures < self.retry_policy.max_attempts:
+                            logger.warning("Error fetching holders for token %s at offset %d, trying again: %s",
+                                           token_address, offset, e)
+                            continuations.append((token_address, offset, failures))
+                        else:
+                            logger.error("Error fetching holders for token %s at offset %d, giving up on "
+                                         "the token: %s", token_address, offset, e)
+                        continue
+                    for holder in holders:
+                        if needed() <= 0:
+                            break
+                        if 'owner' in holder:
+                            self.discovered_addresses.add(holder['owner'])
+                    if len(holders) >= page_size:
+                        continuations.append((token_address, offset + page_size, 0))
+                top_up()
+        finally:
+            # Drop the holder requests still queued; those already in flight finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+            tokens.close()
+
+        logger.info("Discovered %d unique addresses", len(self.discovered_addresses))
         return self.discovered_addresses
 
     def get_account_info(self, address: str) -> Dict:
         """
         Get detailed information about a Solana account/wallet
         """
-        endpoint = f"{self.base_url}/account/{address}"
+        key = ('info', address)
+        cached = self.account_memo.get(key)
+        if cached is not None:
+            return cached
         try:
-            response = requests.get(endpoint, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching account info for {address}: {str(e)}")
+            data = self._get(f"/account/{address}")
+            self.account_memo.set(key, data)
+            return data
+        except REQUEST_ERRORS as e:
+            logger.warning("Error fetching account info for %s: %s", address, e)
+            if isinstance(e, CircuitOpenError):
+                self._defer(address)
+            else:
+                self._fail(address)
             return {}
 
-    def get_account_transactions(self, address: str, limit: int = 100) -> List[Dict]:
+    def get_account_transactions(self, address: str, limit: int = 100, typed: bool = False) -> List[Dict]:
         """
         Get transaction history for a specific account
+
+        With ``typed=True`` only the fields engagement scoring reads are decoded,
+        into compact structs when msgspec is installed.
         """
-        endpoint = f"{self.base_url}/account/transactions"
         params = {
             'account': address,
             'limit': limit
         }
+        key = ('transactions', address, limit, typed)
+        cached = self.account_memo.get(key)
+        if cached is not None:
+            return cached
         try:
-            response = requests.get(endpoint, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching transactions for {address}: {str(e)}")
+            decode = self.decoder.decode_transactions if typed else None
+            data = self._get('/account/transactions', params, decode)
+            self.account_memo.set(key, data)
+            return data
+        except REQUEST_ERRORS as e:
+            logger.warning("Error fetching transactions for %s: %s", address, e)
+            if isinstance(e, CircuitOpenError):
+                self._defer(address)
+            else:
+                self._fail(address)
             return []
 
-    def get_token_holdings(self, address: str) -> List[Dict]:
+    def iter_account_transactions(self, address: str, since: Optional[int] = None,
+                                  until: Optional[int] = None, page_size: int = 50) -> Iterator[Dict]:
+        """
+        Lazily walk an account's full transaction history, newest first
+
+        Pages are requested with the API's ``beforeHash`` cursor and the next page
+        is prefetched in the background while the caller processes the current
+        one, so at most two pages are held in memory.
+
+        Args:
+            address: Account to walk
+            since: Stop at transactions older than this Unix block time
+            until: Skip transactions newer than this Unix block time
+            page_size: Transactions requested per page
+
+        Raises:
+            requests.exceptions.RequestException: If a page cannot be fetched
+        """
+        def fetch_page(before_hash: Optional[str]) -> List[Dict]:
+            params = {'account': address, 'limit': page_size}
+            if before_hash:
+                params['beforeHash'] = before_hash
+            return self._get('/account/transactions', params)
+
+        prefetcher = ThreadPoolExecutor(max_workers=1)
+        next_page = prefetcher.submit(self.profiler.bind(fetch_page), None)
+        try:
+            while next_page is not None:
+                page = next_page.result() or []
+                next_page = None
+
+                # Start fetching the following page before handing this one out
+                if len(page) >= page_size:
+                    cursor = page[-1].get('txHash')
+                    oldest = page[-1].get('blockTime')
+                    if cursor and not (since is not None and oldest is not None and oldest < since):
+                        next_page = prefetcher.submit(self.profiler.bind(fetch_page), cursor)
+
+                for tx in page:
+                    block_time = tx.get('blockTime')
+                    if block_time is not None:
+                        if until is not None and block_time > until:
+                            continue
+                        if since is not None and block_time < since:
+                            return
+                    yield tx
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+            prefetcher.shutdown(wait=False)
+
+    def get_token_holdings(self, address: str, typed: bool = False) -> List[Dict]:
         """
         Get token holdings for a specific account
+
+        With ``typed=True`` only the fields engagement scoring reads are decoded,
+        into compact structs when msgspec is installed.
         """
-        endpoint = f"{self.base_url}/account/tokens"
-        params = {'account': address}
+        key = ('tokens', address, typed)
+        cached = self.account_memo.get(key)
+        if cached is not None:
+            return cached
         try:
-            response = requests.get(endpoint, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching token holdings for {address}: {str(e)}")
+            decode = self.decoder.decode_holdings if typed else None
+            data = self._get('/account/tokens', {'account': address}, decode)
+            self.account_memo.set(key, data)
+            return data
+        except REQUEST_ERRORS as e:
+            logger.warning("Error fetching token holdings for %s: %s", address, e)
+            if isinstance(e, CircuitOpenError):
+                self._defer(address)
+            else:
+                self._fail(address)
             return []
 
-    def find_engaged_wallets(self, address: str) -> Dict:
+    def find_engaged_wallets(self, address: str) -> 'EngagementRecord':
         """
         Find wallets with engagement based on recent transactions and token holdings
-        Returns a dictionary with engagement metrics
-        """
-        engagement_data = {
-            'address': address,
-            'is_active': False,
-            'transaction_count': 0,
-            'token_holdings_count': 0,
-            'total_token_value': 0.0,
-            'last_transaction_time': None,
-            'engagement_score': 0
-        }
-        
+        Returns an EngagementRecord with engagement metrics
+        """
+        transactions = []
+        token_holdings = []
         try:
             # Check recent transactions
-            transactions = self.get_account_transactions(address, limit=10)
-            if transactions:
-                engagement_data['transaction_count'] = len(transactions)
-                if transactions[0].get('blockTime'):
-                    engagement_data['last_transaction_time'] = transactions[0]['blockTime']
-                engagement_data['is_active'] = True
-            
+            with span('get_account_transactions'):
+                transactions = self.get_account_transactions(address, limit=10, typed=True)
             # Check token holdings
-            token_holdings = self.get_token_holdings(address)
-            engagement_data['token_holdings_count'] = len(token_holdings)
-            
-            # Calculate total token value and check for significant holdings
-            for token in token_holdings:
-                try:
-                    amount = float(token.get('amount', 0))
-                    engagement_data['total_token_value'] += amount
-                except (ValueError, TypeError):
-                    continue
-            
-            # Calculate engagement score (simple metric)
-            engagement_data['engagement_score'] = (
-                (engagement_data['transaction_count'] * 10) +
-                (engagement_data['token_holdings_count'] * 5) +
-                (min(engagement_data['total_token_value'], 1000) / 10)
-            )
-            
-            return engagement_data
+            with span('get_token_holdings'):
+                token_holdings = self.get_token_holdings(address, typed=True)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            print(f"Error analyzing engagement for {address}: {str(e)}")
-            return engagement_data
+            logger.warning("Error analyzing engagement for %s: %s", address, e)
+        with span('score'):
+            return score_engagement(address, transactions, token_holdings)
 
     def save_to_csv(self, data: List[Dict], filename: str):
         """
         Save the scraped data to a CSV file
         """
+        save_to_csv(data, filename)
+
+ENGAGEMENT_THRESHOLD = 20  # Minimum engagement score for a wallet to be stored
+
+
+class EngagementRecord(NamedTuple):
+    """
+    Engagement metrics for one wallet
+
+    A tuple subclass without a per-instance __dict__, so hundreds of thousands
+    of records stay cheap to keep in memory and map directly onto CSV rows.
+    """
+    address: str
+    is_active: bool = False
+    transaction_count: int = 0
+    token_holdings_count: int = 0
+    total_token_value: float = 0.0
+    last_transaction_time: Optional[int] = None
+    engagement_score: float = 0
+
+    def to_dict(self) -> Dict:
+        return dict(zip(self._fields, self))
+
+    def to_row(self) -> tuple:
+        return tuple(self)
+
+
+def score_engagement(address: str, transactions: List[Dict], token_holdings: List[Dict]) -> EngagementRecord:
+    """
+    Compute engagement metrics for a wallet from its recent transactions and token holdings
+    """
+    transaction_count = len(transactions)
+    last_transaction_time = None
+    if transactions and transactions[0].get('blockTime'):
+        last_transaction_time = transactions[0].get('blockTime')
+
+    # Calculate total token value and check for significant holdings
+    total_token_value = 0.0
+    for token in token_holdings:
+        try:
+            total_token_value += float(token.get('amount', 0))
+        except (ValueError, TypeError):
+            continue
+
+    # Calculate engagement score (simple metric)
+    engagement_score = (
+        (transaction_count * 10) +
+        (len(token_holdings) * 5) +
+        (min(total_token_value, 1000) / 10)
+    )
+    return EngagementRecord(
+        address=address,
+        is_active=bool(transactions),
+        transaction_count=transaction_count,
+        token_holdings_count=len(token_holdings),
+        total_token_value=total_token_value,
+        last_transaction_time=last_transaction_time,
+        engagement_score=engagement_score,
+    )
+
+
+def save_to_csv(data: List, filename: str):
+    """
+    Save the scraped data to a CSV file
+
+    Lists of EngagementRecord are written row by row without building a DataFrame.
+    """
+    if data and isinstance(data[0], EngagementRecord):
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(EngagementRecord._fields)
+            writer.writerows(record.to_row() for record in data)
+    else:
         df = pd.DataFrame(data)
         df.to_csv(filename, index=False)
-        print(f"Data saved to {filename}")
+    logger.debug("Data saved to %s", filename)
+
+
+class EngagementBatchWriter:
+    """
+    Collect Phase 2 results and write them out batch by batch
+
+    Every ``batch_size`` processed addresses the engaged wallets seen so far are
+    written to their own batch CSV, so results can arrive in any order.
+    """
+
+    def __init__(self, output_dir: str, total_addresses: int, batch_size: int = 50):
+        self.output_dir = output_dir
+        self.total_addresses = total_addresses
+        self.batch_size = batch_size
+        self.processed_count = 0
+        self.batch_index = 0
+        self.batch_data: List[EngagementRecord] = []
+        self.all_wallet_data: List[EngagementRecord] = []  # List to store all wallet engagement data
+        self.failed_addresses = []
+        self.abandoned_addresses = []
+        self.progress = ThroughputReporter('addresses', total_addresses)
+
+    def record(self, engagement_data: EngagementRecord, wallet_info: Optional[Dict] = None):
+        """
+        Record the result for one processed address, writing its details if it is engaged
+        """
+        self.processed_count += 1
+        if wallet_info is not None:
+            self.batch_data.append(engagement_data)
+            with span('write', address=engagement_data.address), \
+                    open(f"{self.output_dir}/{engagement_data.address}_details.json", 'w') as f:
+                json.dump({
+                    'engagement_metrics': engagement_data.to_dict(),
+                    'wallet_info': wallet_info
+                }, f, indent=2)
+        self.progress.add()
+
+        if self.processed_count % self.batch_size == 0:
+            self.flush()
+
+    def record_error(self, address: str):
+        """
+        Record an address whose analysis failed, so batch boundaries stay aligned
+        """
+        self.processed_count += 1
+        self.failed_addresses.append(address)
+        self.progress.add(failed=True)
+        if self.processed_count % self.batch_size == 0:
+            self.flush()
+
+    def record_abandoned(self, address: str):
+        """
+        Record an address whose analysis ran out of time and was left unfinished
+        """
+        self.processed_count += 1
+        self.abandoned_addresses.append(address)
+        self.progress.add(failed=True)
+        if self.processed_count % self.batch_size == 0:
+            self.flush()
+
+    def flush(self):
+        """
+        Save the current batch to CSV and clear it from memory
+        """
+        if self.batch_data:
+            self.all_wallet_data.extend(self.batch_data)
+            batch_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+            # Save batch to CSV
+            batch_filename = f'{self.output_dir}/batch_{self.batch_index}_{batch_timestamp}.csv'
+            with span('write_batch', wallets=len(self.batch_data)):
+                save_to_csv(self.batch_data, batch_filename)
+
+            logger.info("Saved batch %d with %d engaged wallets", self.batch_index + 1, len(self.batch_data))
+            self.batch_data = []
+        self.batch_index += 1
+
+    def close(self):
+        """
+        Flush the last partial batch and save the complete dataset and summary
+        """
+        if self.processed_count % self.batch_size:
+            self.flush()
+        self.progress.close()
+
+        if self.failed_addresses:
+            with open(f'{self.output_dir}/failed_addresses.txt', 'w') as f:
+                for address in self.failed_addresses:
+                    f.write(f"{address}\n")
+
+        if self.abandoned_addresses:
+            with open(f'{self.output_dir}/abandoned_addresses.txt', 'w') as f:
+                for address in self.abandoned_addresses:
+                    f.write(f"{address}\n")
+
+        if not self.all_wallet_data:
+            return
+
+        # Sort by engagement score
+        self.all_wallet_data.sort(key=lambda x: x.engagement_score, reverse=True)
+
+        # Save complete dataset
+        save_to_csv(self.all_wallet_data, f'{self.output_dir}/all_engaged_wallets.csv')
+
+        # Save summary statistics
+        summary = {
+            'total_addresses_processed': self.total_addresses,
+            'total_engaged_wallets': len(self.all_wallet_data),
+            'average_engagement_score': sum(w.engagement_score for w in self.all_wallet_data) / len(self.all_wallet_data),
+            'top_engaged_wallets': [w.to_dict() for w in self.all_wallet_data[:10]]  # Top 10 most engaged wallets
+        }
+
+        with open(f'{self.output_dir}/analysis_summary.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+def analyze_address(scraper: SolscanScraper, address: str,
+                    budget: Optional[float] = None) -> Tuple[EngagementRecord, Optional[Dict]]:
+    """
+    Analyze one wallet, fetching its account details only if it is engaged
+
+    Raises CircuitOpenError if any lookup for the address was skipped by an open
+    circuit, so the caller can retry it later instead of storing partial metrics,
+    and LookupFailedError if a lookup failed after every retry.
+    With a ``budget``, every request for the wallet must finish within that many
+    seconds in total, otherwise DeadlineExceeded is raised.
+    """
+    with span('wallet', address=address) as wallet_span, deadline(budget):
+        with span('find_engaged_wallets'):
+            engagement_data = scraper.find_engaged_wallets(address)
+        wallet_span.set(score=engagement_data.engagement_score)
+
+        # Only store data for engaged wallets (you can adjust this threshold)
+        wallet_info = None
+        if engagement_data.engagement_score > ENGAGEMENT_THRESHOLD:
+            with span('get_account_info'):
+                wallet_info = scraper.get_account_info(address)
+    failed = scraper.take_failed(address)
+    if scraper.take_deferred(address):
+        raise CircuitOpenError('address lookups', scraper.breakers.seconds_until_retry())
+    if failed:
+        raise LookupFailedError(f"A lookup for {address} failed")
+    return engagement_data, wallet_info
+
+
+def analyze_addresses(scraper: SolscanScraper, addresses: List[str], writer: EngagementBatchWriter,
+                      workers: int = 1, deferred_passes: int = 1, wallet_budget: Optional[float] = None,
+                      profiler: Optional[PhaseProfiler] = None) -> EngagementBatchWriter:
+    """
+    Analyze wallet engagement for many addresses, optionally over a thread pool
+
+    With more than one worker the addresses are fanned out over a
+    ThreadPoolExecutor and results are handed to the writer in completion order.
+    Addresses skipped by an open circuit are queued and retried once the
+    circuits allow trial calls again. A half-open circuit lets only its trial
+    call through and rejects the rest, so the rejected addresses are simply
+    queued again; a retry pass only counts towards ``deferred_passes`` if it
+    leaves a circuit open, i.e. the endpoint failed its trial. Addresses that
+    take longer than ``wallet_budget`` seconds are abandoned so a slow wallet
+    cannot hold a worker indefinitely. With a ``profiler``, worker threads are
+    profiled too and writing results counts as the 'output' phase.
+    """
+    profiler = profiler or PhaseProfiler()
+    pending = addresses
+    passes_left = deferred_passes
+    while True:
+        deferred = _analyze_pass(scraper, pending, writer, workers, can_defer=passes_left > 0,
+                                 wallet_budget=wallet_budget, profiler=profiler)
+        if not deferred:
+            break
+        if pending is not addresses and OPEN in scraper.breakers.states().values():
+            passes_left -= 1
+        wait = scraper.breakers.seconds_until_retry()
+        logger.info("Retrying %d deferred addresses in %.0fs", len(deferred), wait)
+        time.sleep(wait)
+        pending = deferred
+
+    with profiler.phase('output'):
+        writer.close()
+    return writer
+
+
+def _analyze_pass(scraper: SolscanScraper, addresses: List[str], writer: EngagementBatchWriter,
+                  workers: int, can_defer: bool, wallet_budget: Optional[float] = None,
+                  profiler: Optional[PhaseProfiler] = None) -> List[str]:
+    """
+    Analyze each address once and return the addresses deferred by an open circuit
+    """
+    deferred = []
+    profiler = profiler or PhaseProfiler()
+
+    def handle(address: str, get_result: Callable[[], Tuple[EngagementRecord, Optional[Dict]]]):
+        try:
+            result = get_result()
+            with profiler.phase('output'):
+                writer.record(*result)
+        except DeadlineExceeded as e:
+            logger.warning("Abandoned address %s: %s", address, e)
+            writer.record_abandoned(address)
+        except CircuitOpenError as e:
+            if can_defer:
+                deferred.append(address)
+            else:
+                logger.warning("Giving up on address %s: %s", address, e)
+                writer.record_error(address)
+        except Exception as e:
+            logger.warning("Error processing address %s: %s", address, e)
+            writer.record_error(address)
+
+    if workers <= 1:
+        for address in addresses:
+            logger.debug("Processing address %d/%d: %s", writer.processed_count + 1, writer.total_addresses, address)
+            handle(address, lambda: analyze_address(scraper, address, wallet_budget))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Bound now, while the 'analysis' phase runs; workers may start while results are written
+            analyze = profiler.bind(analyze_address)
+            futures = {executor.submit(analyze, scraper, address, wallet_budget): address for address in addresses}
+            for future in as_completed(futures):
+                address = futures[future]
+                handle(address, future.result)
+                logger.debug("Processed address %d/%d: %s", writer.processed_count, writer.total_addresses, address)
+    return deferred
+
 
 def main():
-    scraper = SolscanScraper()
+    parser = argparse.ArgumentParser(description='Discover and analyze engaged Solana wallets via the Solscan API')
+    parser.add_argument('-n', '--max_addresses', type=int, default=1000,
+                        help='Number of addresses to discover and analyze')
+    parser.add_argument('--batch_size', type=int, default=50,
+                        help='Number of processed addresses per batch CSV')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of threads analyzing addresses in parallel')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Analyze wallets with the asyncio client')
+    parser.add_argument('--concurrency', type=int, default=20,
+                        help='Maximum in-flight requests in --async mode')
+    parser.add_argument('--cache', metavar='PATH',
+                        help='Cache API responses in this SQLite file across runs')
+    parser.add_argument('--cache_max_entries', type=int, default=100_000,
+                        help='Maximum number of responses kept in the --cache file')
+    parser.add_argument('--validation_ttl', type=float, default=24 * 3600,
+                        help='Seconds a successful API key validation is remembered on disk (0 to always validate)')
+    parser.add_argument('--json_backend', choices=JSONDecoder.BACKENDS, default='auto',
+                        help='JSON decoder for API responses (auto picks orjson or msgspec when installed)')
+    parser.add_argument('--max_attempts', type=int, default=4,
+                        help='Attempts per request before a transient failure is given up on')
+    parser.add_argument('--backoff_base', type=float, default=0.5,
+                        help='Backoff ceiling in seconds before the first retry (doubles per retry, full jitter)')
+    parser.add_argument('--backoff_cap', type=float, default=30.0,
+                        help='Maximum backoff in seconds between retries')
+    parser.add_argument('--rate', type=float, default=3.0,
+                        help='Maximum API requests per second per API key (token-bucket rate)')
+    parser.add_argument('--burst', type=float, default=3.0,
+                        help='Number of requests allowed back to back before --rate applies')
+    parser.add_argument('--wallet_budget', type=float, default=120.0,
+                        help='Seconds allowed for analyzing one wallet before it is abandoned (0 for no limit)')
+    parser.add_argument('--request_timeout', type=float, default=60.0,
+                        help='Hard limit in seconds on any single request, including reading the body')
+    parser.add_argument('--base_url',
+                        help='API root to send requests to, e.g. a local mock_solscan_server '
+                             '(defaults to SOLSCAN_BASE_URL or the public Solscan API)')
+    parser.add_argument('--record', metavar='DIR',
+                        help='Record every API response to a compressed archive in DIR')
+    parser.add_argument('--replay', metavar='DIR',
+                        help='Serve API responses from an archive recorded with --record, without the network')
+    parser.add_argument('--metrics_port', type=int,
+                        help='Serve per-endpoint request metrics for Prometheus on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--http2', action='store_true',
+                        help="Multiplex the threaded client's requests over one HTTP/2 connection (needs httpx[http2])")
+    parser.add_argument('--trace', metavar='FILE',
+                        help='Write per-wallet spans (rate limiting, requests, decoding, scoring, writes) to FILE '
+                             'as a Chrome trace for Perfetto or chrome://tracing')
+    parser.add_argument('--profile', nargs='?', const='profile', metavar='DIR',
+                        help='Profile the discovery, analysis and output phases with cProfile and write a '
+                             '.prof file per phase plus report.txt to DIR (default: profile)')
+    parser.add_argument('--log_level', choices=LOG_LEVELS, default='info',
+                        help='Log verbosity; quiet shows only errors and periodic throughput summaries')
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+    if args.use_async and (args.record or args.replay):
+        parser.error('--record and --replay are only supported by the threaded client')
+    if args.use_async and args.http2:
+        parser.error('--http2 is only supported by the threaded client')
+    if args.cache and (args.record or args.replay):
+        parser.error('--record and --replay cannot be combined with --cache')
+    wallet_budget = args.wallet_budget or None
+
+    rate_limiter = RateLimiter(requests_per_second=args.rate, burst=args.burst)
+    cache = ResponseCache(args.cache, max_entries=args.cache_max_entries) if args.cache else None
+    validation_cache = ValidationCache(ttl=args.validation_ttl)
+    key_pool = None
+    if args.record or args.replay:
+        # Always validate, so the probes are part of the archive and replay the same way
+        validation_cache = ValidationCache(ttl=0)
+    if args.replay:
+        # Replayed responses need neither a real key nor pacing
+        rate_limiter = RateLimiter(requests_per_second=1e9, burst=1e9)
+        key_pool = APIKeyPool(['replay'], rate_limiter)
+    retry_policy = RetryPolicy(args.max_attempts, args.backoff_base, args.backoff_cap)
+    metrics = Metrics()
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(metrics, args.metrics_port).start()
+        logger.info("Serving metrics on %s", metrics_server.url)
+    tracer = None
+    if args.trace:
+        tracer = Tracer(args.trace)
+        set_tracer(tracer)
+    profiler = PhaseProfiler(args.profile)
+    if args.use_async:
+        from async_solscan_scraper import run_async
+        asyncio.run(run_async(args.max_addresses, args.batch_size, args.concurrency, rate_limiter, cache,
+                              validation_cache, args.json_backend, retry_policy, wallet_budget,
+                              args.request_timeout, args.base_url, metrics, profiler))
+        log_cache_stats(cache)
+        if cache is not None:
+            cache.close()
+        close_tracer(tracer)
+        write_profile(profiler)
+        if metrics_server is not None:
+            metrics_server.close()
+        return
+
+    scraper = SolscanScraper(pool_size=max(10, args.workers), rate_limiter=rate_limiter, cache=cache,
+                             validation_cache=validation_cache, json_backend=args.json_backend,
+                             retry_policy=retry_policy, request_timeout=args.request_timeout, http2=args.http2,
+                             base_url=args.base_url, key_pool=key_pool, record_dir=args.record,
+                             replay_dir=args.replay, metrics=metrics, profiler=profiler)
 
     # First, discover active wallet addresses
-    print("Phase 1: Discovering active wallet addresses...")
-    max_addresses = 1000  # Adjust this number based on how many addresses you want to analyze
-    discovered_addresses = scraper.discover_addresses(max_addresses=max_addresses)
+    logger.info("Phase 1: Discovering active wallet addresses")
+    with profiler.phase('discovery'):
+        discovered_addresses = scraper.discover_addresses(max_addresses=args.max_addresses)
     
     # Convert set to list for processing
     addresses_to_scrape = list(discovered_addresses)
+    with profiler.phase('output'):
+        save_discovered_addresses(addresses_to_scrape)
+    logger.info("Phase 2: Analyzing wallet engagement")
     
-    # Optionally save discovered addresses to file
-    with open('discovered_addresses.txt', 'w') as f:
-        for addr in addresses_to_scrape:
+    output_dir = create_output_dir()
+    total_addresses = len(addresses_to_scrape)
+    writer = EngagementBatchWriter(output_dir, total_addresses, args.batch_size)
+
+    logger.info("Starting to analyze %d addresses with %d worker(s)", total_addresses, args.workers)
+
+    with profiler.phase('analysis'):
+        analyze_addresses(scraper, addresses_to_scrape, writer, workers=args.workers, wallet_budget=wallet_budget,
+                          profiler=profiler)
+    log_run_summary(total_addresses, writer)
+
+    stats = scraper.get_connection_stats()
+    if args.replay:
+        logger.info("- Replayed %d API requests from %s", stats['requests'], args.replay)
+    else:
+        logger.info("- Sent %d API requests over %d connections (%d reused)",
+                    stats['requests'], stats['connections_opened'], stats['connections_reused'])
+    logger.info("- Rate limited %d times by the API, retried %d requests",
+                scraper.key_pool.throttled_count(), scraper.retry_count)
+    log_key_stats(scraper.key_pool)
+    logger.info("- Coalesced %d duplicate in-flight requests", scraper.inflight.shared_count)
+    logger.info("- Failed fast on %d requests to endpoints with an open circuit", scraper.breakers.rejected_count())
+    log_memo_stats(scraper.account_memo)
+    log_cache_stats(cache)
+    log_endpoint_stats(metrics)
+    scraper.close()
+    if cache is not None:
+        cache.close()
+    close_tracer(tracer)
+    write_profile(profiler)
+    if metrics_server is not None:
+        metrics_server.close()
+
+
+def save_discovered_addresses(addresses: List[str], filename: str = 'discovered_addresses.txt'):
+    """
+    Save discovered addresses to a text file, one per line
+    """
+    with open(filename, 'w') as f:
+        for addr in addresses:
             f.write(f"{addr}\n")
-    
-    print(f"\nSaved {len(addresses_to_scrape)} discovered addresses to 'discovered_addresses.txt'")
-    print("\nPhase 2: Analyzing wallet engagement...")
-    
-    # Create directory for output files
+
+    logger.info("Saved %d discovered addresses to %s", len(addresses), filename)
+
+
+def create_output_dir() -> str:
+    """
+    Create a timestamped directory for Phase 2 output files
+    """
     output_dir = f'solscan_engaged_wallets_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
     os.makedirs(output_dir, exist_ok=True)
+    return output_dir
 
-    all_wallet_data = []  # List to store all wallet engagement data
-    processed_count = 0
-    total_addresses = len(addresses_to_scrape)
 
-    print(f"Starting to analyze {total_addresses} addresses...")
+def log_run_summary(total_addresses: int, writer: EngagementBatchWriter):
+    """
+    Log the end-of-run analysis summary
+    """
+    logger.info("Analysis completed:")
+    logger.info("- Processed %d addresses", total_addresses)
+    logger.info("- Found %d engaged wallets", len(writer.all_wallet_data))
+    if writer.failed_addresses:
+        logger.info("- Failed to analyze %d addresses (see failed_addresses.txt)", len(writer.failed_addresses))
+    if writer.abandoned_addresses:
+        logger.info("- Abandoned %d addresses that ran out of time (see abandoned_addresses.txt)",
+                    len(writer.abandoned_addresses))
+    logger.info("- Results saved in %s/", writer.output_dir)
+
+
+def log_key_stats(key_pool: APIKeyPool):
+    """
+    Log how requests were spread over the API keys, when there is more than one
+    """
+    if len(key_pool.keys) < 2:
+        return
+    for stats in key_pool.stats():
+        logger.info("- API key %s: %d requests, benched %d times", stats['key'], stats['requests'], stats['benched'])
+
+
+def log_endpoint_stats(metrics: Metrics):
+    """
+    Log request counts and latency quantiles per endpoint
+    """
+    summary = metrics.summary()
+    if not summary:
+        return
+    logger.info("- Requests per endpoint (latency p50/p95/p99):")
+    for stats in summary:
+        latency = '/'.join(f"{stats[p] * 1000:.0f}" for p in ('p50', 'p95', 'p99'))
+        statuses = ', '.join(f"{status}: {count}" for status, count in sorted(stats['statuses'].items()))
+        logger.info("  %s: %d requests, %s ms, %.0f KiB, %d retries (%s)", stats['endpoint'], stats['requests'],
+                    latency, stats['bytes_received'] / 1024, stats['retries'], statuses)
+
+
+def log_memo_stats(memo: TTLLRUCache):
+    """
+    Log hit counts of the in-memory account lookup cache
+    """
+    stats = memo.stats()
+    logger.info("- Account lookup memo: %d hits, %d misses (%.0f%% hit rate)",
+                stats['hits'], stats['misses'], stats['hit_rate'] * 100)
+
+
+def log_cache_stats(cache: Optional[ResponseCache]):
+    """
+    Log response cache hit/miss counts
+    """
+    if cache is None:
+        return
+    stats = cache.stats()
+    logger.info("- Response cache: %d hits, %d misses (%.0f%% hit rate), %d revalidated with 304, "
+                "%d entries, %d evicted", stats['hits'], stats['misses'], stats['hit_rate'] * 100,
+                stats['revalidations'], stats['entries'], stats['evictions'])
+
+
+def close_tracer(tracer: Optional[Tracer]):
+    """
+    Stop tracing and finish the trace file, if tracing was enabled
+    """
+    if tracer is None:
+        return
+    set_tracer(None)
+    tracer.close()
+    logger.info("- Wrote %d trace spans to %s (open in https://ui.perfetto.dev)", tracer.span_count, tracer.path)
 
-    # Process addresses in batches to manage memory
-    batch_size = 50
-    for i in range(0, total_addresses, batch_size):
-        batch = addresses_to_scrape[i:i + batch_size]
-        batch_data = []
 
-        for address in batch:
-            try:
-                processed_count += 1
-                print(f"Processing address {processed_count}/{total_addresses}: {address}")
-                
-                # Analyze wallet engagement
-                engagement_data = scraper.find_engaged_wallets(address)
-                
-                # Only store data for engaged wallets (you can adjust this threshold)
-                if engagement_data['engagement_score'] > 20:
-                    batch_data.append(engagement_data)
-                    
-                    # Save detailed wallet data
-                    wallet_info = scraper.get_account_info(address)
-                    with open(f'{output_dir}/{address}_details.json', 'w') as f:
-                        json.dump({
-                            'engagement_metrics': engagement_data,
-                            'wallet_info': wallet_info
-                        }, f, indent=2)
-                
-                # Be polite and wait for a second to avoid overloading the API
-                time.sleep(1)
-                
-            except Exception as e:
-                print(f"Error processing address {address}: {str(e)}")
-                continue
-        
-        # Save batch data and clear memory
-        if batch_data:
-            all_wallet_data.extend(batch_data)
-            batch_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            
-            # Save batch to CSV
-            batch_filename = f'{output_dir}/batch_{i//batch_size}_{batch_timestamp}.csv'
-            scraper.save_to_csv(batch_data, batch_filename)
-            
-            print(f"Saved batch {i//batch_size + 1} with {len(batch_data)} engaged wallets")
-    
-    # Save final summary
-    if all_wallet_data:
-        # Sort by engagement score
-        all_wallet_data.sort(key=lambda x: x['engagement_score'], reverse=True)
-        
-        # Save complete dataset
-        scraper.save_to_csv(all_wallet_data, f'{output_dir}/all_engaged_wallets.csv')
-        
-        # Save summary statistics
-        summary = {
-            'total_addresses_processed': total_addresses,
-            'total_engaged_wallets': len(all_wallet_data),
-            'average_engagement_score': sum(w['engagement_score'] for w in all_wallet_data) / len(all_wallet_data),
-            'top_engaged_wallets': all_wallet_data[:10]  # Top 10 most engaged wallets
-        }
-        
-        with open(f'{output_dir}/analysis_summary.json', 'w') as f:
-            json.dump(summary, f, indent=2)
 
-    print(f"\nAnalysis completed:")
-    print(f"- Processed {total_addresses} addresses")
-    print(f"- Found {len(all_wallet_data)} engaged wallets")
-    print(f"- Results saved in {output_dir}/")
+def write_profile(profiler: PhaseProfiler):
+    """
+    Write the per-phase profile reports, if profiling was enabled
+    """
+    report_path = profiler.write_reports()
+    if report_path is not None:
+        logger.info("- Wrote per-phase profiles to %s", report_path)
 
 
 if __name__ == "__main__":
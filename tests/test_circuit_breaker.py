@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import solscan_scraper
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+from solscan_scraper import EngagementBatchWriter, LookupFailedError, score_engagement
+
+ENDPOINT = '/account/tokens'
+
+
+class FlakyEndpoint:
+    """
+    Stand-in for an endpoint that fails every call until ``outage`` seconds have passed
+    """
+
+    def __init__(self, outage: float):
+        self.recovers_at = time.monotonic() + outage
+
+    def call(self, breaker: CircuitBreaker):
+        breaker.before_call()
+        time.sleep(0.005)
+        if time.monotonic() < self.recovers_at:
+            breaker.record_failure()
+            raise LookupFailedError('endpoint down')
+        breaker.record_success()
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_opens_after_threshold_and_closes_after_successful_trial(self):
+        breaker = CircuitBreaker(ENDPOINT, failure_threshold=2, recovery_timeout=0.05)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.seconds_until_retry(), 0.0)
+        breaker.before_call()
+        self.assertEqual(breaker.state, HALF_OPEN)
+        # Only one trial call at a time while half-open
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.before_call()
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(ENDPOINT, failure_threshold=1, recovery_timeout=0.05)
+        breaker.before_call()
+        breaker.record_failure()
+        time.sleep(0.06)
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertGreater(breaker.seconds_until_retry(), 0.0)
+
+
+class DeferredPassTest(unittest.TestCase):
+    """
+    Addresses deferred by an open circuit are all analyzed once the endpoint recovers
+    """
+
+    addresses = [f'address{i}' for i in range(200)]
+    failure_threshold = 3
+    workers = 8
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.writer = EngagementBatchWriter(self.output_dir.name, len(self.addresses))
+        self.breakers = CircuitBreakerRegistry(failure_threshold=self.failure_threshold, recovery_timeout=0.2)
+
+    def tearDown(self):
+        self.output_dir.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def assert_recovered(self):
+        writer = self.writer
+        self.assertEqual(writer.processed_count, len(self.addresses))
+        self.assertEqual(writer.abandoned_addresses, [])
+        # Only calls that reached the endpoint during the outage may fail
+        self.assertLessEqual(len(writer.failed_addresses), self.failure_threshold + self.workers)
+
+    def test_threaded(self):
+        endpoint = FlakyEndpoint(outage=0.1)
+        scraper = mock.Mock(breakers=self.breakers)
+
+        def analyze_address(scraper, address, budget=None):
+            endpoint.call(scraper.breakers.get(ENDPOINT))
+            return score_engagement(address, [], []), None
+
+        with mock.patch.object(solscan_scraper, 'analyze_address', analyze_address):
+            solscan_scraper.analyze_addresses(scraper, self.addresses, self.writer, workers=self.workers)
+        self.assert_recovered()
+
+    def test_threaded_gives_up_on_a_dead_endpoint(self):
+        endpoint = FlakyEndpoint(outage=60)
+        scraper = mock.Mock(breakers=self.breakers)
+
+        def analyze_address(scraper, address, budget=None):
+            endpoint.call(scraper.breakers.get(ENDPOINT))
+            return score_engagement(address, [], []), None
+
+        with mock.patch.object(solscan_scraper, 'analyze_address', analyze_address):
+            solscan_scraper.analyze_addresses(scraper, self.addresses, self.writer, workers=self.workers)
+        self.assertEqual(len(self.writer.failed_addresses), len(self.addresses))
+
+    def test_async(self):
+        try:
+            import async_solscan_scraper
+        except ImportError:
+            self.skipTest('aiohttp is not installed')
+        endpoint = FlakyEndpoint(outage=0.1)
+        breakers = self.breakers
+
+        class Scraper:
+            concurrency = self.workers
+            deferred_addresses = set()
+            failed_addresses = set()
+
+            async def find_engaged_wallets(self, address):
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, endpoint.call, breakers.get(ENDPOINT))
+                except CircuitOpenError:
+                    self.deferred_addresses.add(address)
+                except LookupFailedError:
+                    self.failed_addresses.add(address)
+                return score_engagement(address, [], [])
+
+        scraper = Scraper()
+        scraper.breakers = breakers
+        asyncio.run(async_solscan_scraper.analyze_addresses(scraper, self.addresses, self.writer))
+        self.assert_recovered()
+
+
+if __name__ == '__main__':
+    unittest.main()
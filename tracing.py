@@ -0,0 +1,167 @@
+import heapq
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+
+class Tracer:
+    """
+    Write spans to a Chrome trace file, viewable in Perfetto (ui.perfetto.dev) or chrome://tracing
+
+    Events are streamed to disk as spans finish, so a long run does not keep
+    them in memory. Every top-level span (one per wallet) is drawn on a lane of
+    its own, and its child spans nest under it on the same lane. Lanes are
+    reused once their span ends, so the number of lanes tracks the number of
+    wallets in flight and overlapping stages line up side by side.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: File to write the trace to
+        """
+        self.path = path
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._file = open(path, 'w')
+        self._file.write('[\n')
+        self._lock = threading.Lock()
+        self._free_lanes: List[int] = []
+        self._lane_count = 0
+        self.span_count = 0
+
+    def now(self) -> float:
+        """
+        Microseconds since the tracer was created
+        """
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def acquire_lane(self) -> int:
+        with self._lock:
+            if self._free_lanes:
+                return heapq.heappop(self._free_lanes)
+            self._lane_count += 1
+            lane = self._lane_count
+            self._write({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': lane,
+                         'args': {'name': f'lane {lane}'}})
+            return lane
+
+    def release_lane(self, lane: int):
+        with self._lock:
+            heapq.heappush(self._free_lanes, lane)
+
+    def record(self, name: str, lane: int, start: float, end: float, args: Dict[str, Any]):
+        """
+        Write one finished span as a complete ('X') event
+        """
+        event = {'name': name, 'cat': 'solscan', 'ph': 'X', 'pid': self.pid, 'tid': lane,
+                 'ts': round(start, 1), 'dur': round(end - start, 1), 'args': args}
+        with self._lock:
+            self._write(event)
+            self.span_count += 1
+
+    def _write(self, event: Dict):
+        if not self._file.closed:
+            self._file.write(json.dumps(event, separators=(',', ':'), default=str) + ',\n')
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            # A trailing metadata event keeps the array valid JSON despite the comma after each event
+            self._file.write(json.dumps({'name': 'process_name', 'ph': 'M', 'pid': self.pid,
+                                         'args': {'name': 'solscan scraper'}}) + '\n]\n')
+            self._file.close()
+
+
+_tracer: Optional[Tracer] = None
+_current_span: ContextVar[Optional['Span']] = ContextVar('current_span', default=None)
+
+
+def set_tracer(tracer: Optional[Tracer]):
+    """
+    Install the tracer every span() call records to, or None to stop tracing
+    """
+    global _tracer
+    _tracer = tracer
+
+
+class Span:
+    """
+    One timed stage, recorded when the ``with`` block exits
+
+    Nested spans inherit the lane of the span they run under, including in
+    asyncio tasks started inside it. A span that starts while a sibling still
+    runs on that lane (concurrent lookups under asyncio.gather) gets a lane of
+    its own, so slices on one lane always nest properly.
+    """
+
+    def __init__(self, tracer: Tracer, name: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.lane = 0
+        self._parent: Optional[Span] = None
+        self._own_lane = False
+        self._child_running = False
+        self._start = 0.0
+        self._token = None
+
+    def set(self, **args: Any):
+        """
+        Attach more attributes, e.g. the status a request finished with
+        """
+        self.args.update(args)
+
+    def __enter__(self) -> 'Span':
+        parent = _current_span.get()
+        if parent is not None and parent.tracer is self.tracer and not parent._child_running:
+            self.lane = parent.lane
+            self._parent = parent
+            parent._child_running = True
+        else:
+            self.lane = self.tracer.acquire_lane()
+            self._own_lane = True
+        self._token = _current_span.set(self)
+        self._start = self.tracer.now()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = self.tracer.now()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.record(self.name, self.lane, self._start, end, self.args)
+        if self._parent is not None:
+            self._parent._child_running = False
+        if self._own_lane:
+            self.tracer.release_lane(self.lane)
+
+
+class _NoSpan:
+    def set(self, **args: Any):
+        pass
+
+    def __enter__(self) -> '_NoSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, **args: Any):
+    """
+    Time the enclosed block as a span named ``name`` with attributes ``args``
+
+    Costs next to nothing while no tracer is installed.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NO_SPAN
+    return Span(tracer, name, args)
@@ -0,0 +1,139 @@
+import base64
+import gzip
+import io
+import json
+import os
+import threading
+from typing import Dict, List
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+ARCHIVE_NAME = 'traffic.jsonl.gz'
+
+
+def request_key(method: str, url: str) -> str:
+    """
+    Identify a request by method, path and sorted query, ignoring the host and headers
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method} {parts.path}?{query}" if query else f"{method} {parts.path}"
+
+
+class RecordingAdapter(BaseAdapter):
+    """
+    Transport adapter that passes requests to another adapter and records every
+    response to a gzip-compressed JSON Lines archive
+
+    Each line holds the request key, status, headers and body of one response,
+    in the order the responses arrived. Failed connections are not recorded.
+    """
+
+    def __init__(self, adapter: BaseAdapter, directory: str):
+        """
+        Args:
+            adapter: Adapter that actually sends the requests
+            directory: Directory to write the archive to (created if missing)
+        """
+        super().__init__()
+        self.adapter = adapter
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, ARCHIVE_NAME)
+        self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.recorded_count = 0
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout=None, verify=True,
+             cert=None, proxies=None) -> requests.Response:
+        response = self.adapter.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                     proxies=proxies)
+        entry = {
+            'key': request_key(request.method, request.url),
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': dict(response.headers),
+        }
+        body = response.content
+        try:
+            entry['body'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body_base64'] = base64.b64encode(body).decode('ascii')
+        line = json.dumps(entry, separators=(',', ':'))
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + '\n')
+                self.recorded_count += 1
+        return response
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        self.adapter.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport adapter that answers requests from an archive written by RecordingAdapter
+
+    The whole archive is loaded into memory up front, so responses are served
+    without any network or disk access. Responses recorded for the same
+    request are replayed in their recorded order, the last one repeating once
+    they run out. Requests missing from the archive get a 404.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Directory holding the archive
+        """
+        super().__init__()
+        self.path = os.path.join(directory, ARCHIVE_NAME)
+        self._responses: Dict[str, List[Dict]] = {}
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if 'body_base64' in entry:
+                    entry['body'] = base64.b64decode(entry.pop('body_base64'))
+                else:
+                    entry['body'] = entry['body'].encode('utf-8')
+                self._responses.setdefault(entry['key'], []).append(entry)
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.replayed_count = 0
+        self.missed_count = 0
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout=None, verify=True,
+             cert=None, proxies=None) -> requests.Response:
+        key = request_key(request.method, request.url)
+        with self._lock:
+            entries = self._responses.get(key)
+            if entries:
+                position = self._positions.get(key, 0)
+                entry = entries[min(position, len(entries) - 1)]
+                self._positions[key] = position + 1
+                self.replayed_count += 1
+            else:
+                entry = {'status': 404, 'reason': 'Not Found', 'headers': {'Content-Type': 'application/json'},
+                         'body': json.dumps({'error': f'{key} is not in the replay archive'}).encode('utf-8')}
+                self.missed_count += 1
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        # The recorded body is already decoded
+        response.headers.pop('Content-Encoding', None)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(entry['body'])
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
@@ -14,9 +14,15 @@ import random
 from datetime import datetime
 import os
 import argparse
+import logging
 import base58
+
+from logging_config import LOG_LEVELS, ThroughputReporter, configure_logging
+from profiling import PhaseProfiler
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 class TransactionScraper:
     @staticmethod
     def is_valid_solana_address(address: str) -> bool:
@@ -52,12 +58,14 @@ class TransactionScraper:
         except Exception:
             return False
             
-    def __init__(self, headless: bool = True):
+    def __init__(self, headless: bool = True, profiler: Optional[PhaseProfiler] = None):
         """Initialize the scraper
         
         Args:
             headless: Whether to run Chrome in headless mode
+            profiler: Profiles the navigation, wait, extraction and save phases when enabled
         """
+        self.profiler = profiler or PhaseProfiler()
         self.setup_driver(headless)
         self.base_url = "https://solscan.io/txs"
         self.wallet_addresses: Set[str] = set()
@@ -73,7 +81,7 @@ class TransactionScraper:
         
         # Run in non-headless mode for now to debug
         if headless:
-            print("Running in non-headless mode for debugging")
+            logger.info("Running in non-headless mode for debugging")
         
         # Add common options for stability
         chrome_options.add_argument("--no-sandbox")
@@ -113,10 +121,10 @@ class TransactionScraper:
             self.driver.execute_script(
                 "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});")
             
-            print(f"Successfully initialized Chrome driver with version {self.driver.capabilities['browserVersion']}")
+            logger.info("Successfully initialized Chrome driver with version %s", self.driver.capabilities['browserVersion'])
             
         except Exception as e:
-            print(f"Error details: {str(e)}")
+            logger.error("Error details: %s", e)
             raise Exception(f"Failed to initialize Chrome driver. Make sure Chrome browser is installed.")
         
     def is_valid_solana_address(self, address: str) -> bool:
@@ -129,7 +137,8 @@ class TransactionScraper:
     
     def random_delay(self, min_seconds: float = 1.0, max_seconds: float = 3.0):
         """Add a random delay to avoid detection"""
-        time.sleep(random.uniform(min_seconds, max_seconds))
+        with self.profiler.phase('wait'):
+            time.sleep(random.uniform(min_seconds, max_seconds))
         
     def wait_for_element(self, by: By, value: str, timeout: int = 10) -> Optional[bool]:
         """Wait for an element to be present and visible"""
@@ -139,14 +148,18 @@ class TransactionScraper:
             )
             return bool(element)
         except TimeoutException:
-            print(f"Timeout waiting for element: {value}")
+            logger.warning("Timeout waiting for element: %s", value)
             return None
         except Exception as e:
-            print(f"Error waiting for element {value}: {e}")
+            logger.warning("Error waiting for element %s: %s", value, e)
             return None
         
     def wait_for_page_load(self, timeout: int = 30) -> bool:
         """Wait for the page to load completely"""
+        with self.profiler.phase('wait'):
+            return self._wait_for_page_load(timeout)
+
+    def _wait_for_page_load(self, timeout: int) -> bool:
         try:
             # Wait for document ready state
             WebDriverWait(self.driver, timeout).until(
@@ -172,22 +185,26 @@ class TransactionScraper:
             return True
             
         except Exception as e:
-            print(f"Error waiting for page load: {e}")
+            logger.warning("Error waiting for page load: %s", e)
             return False
     
     def extract_addresses_from_page(self) -> Set[str]:
         """Extract wallet addresses from the current page"""
+        with self.profiler.phase('extraction'):
+            return self._extract_addresses_from_page()
+
+    def _extract_addresses_from_page(self) -> Set[str]:
         addresses = set()
         
         try:
             # Wait for page to load completely
             if not self.wait_for_page_load():
-                print("Page did not load completely")
+                logger.warning("Page did not load completely")
                 return addresses
             
             # Debug: Print page title and URL
-            print(f"Current page title: {self.driver.title}")
-            print(f"Current URL: {self.driver.current_url}")
+            logger.debug("Current page title: %s", self.driver.title)
+            logger.debug("Current URL: %s", self.driver.current_url)
             
             # Try different selectors for the transaction table
             table_selectors = [
@@ -202,68 +219,64 @@ class TransactionScraper:
             
             for selector in table_selectors:
                 try:
-                    print(f"Trying selector: {selector}")
+                    logger.debug("Trying selector: %s", selector)
                     table_element = WebDriverWait(self.driver, 5).until(
                         EC.presence_of_element_located((By.CSS_SELECTOR, selector))
                     )
                     used_selector = selector
-                    print(f"Found table with selector: {selector}")
+                    logger.debug("Found table with selector: %s", selector)
                     break
                 except TimeoutException:
                     continue
             
             if not table_element:
-                print("Could not find transaction table with any selector")
-                # Debug: Print page source
-                print("Page source preview:")
-                print(self.driver.page_source[:1000])
+                logger.warning("Could not find transaction table with any selector")
+                logger.debug("Page source preview:\n%s", self.driver.page_source[:1000])
                 return addresses
             
             # Get all rows directly using Selenium
             rows = table_element.find_elements(By.TAG_NAME, "tr")
-            print(f"Found {len(rows)} rows using Selenium")
+            logger.debug("Found %d rows using Selenium", len(rows))
             
             # Process each row
             for row in rows:
                 try:
                     # Get all links in the row
                     links = row.find_elements(By.TAG_NAME, "a")
-                    print(f"Found {len(links)} links in row")
+                    logger.debug("Found %d links in row", len(links))
                     
                     for link in links:
                         try:
                             href = link.get_attribute("href") or ""
                             text = link.text.strip()
                             
-                            print(f"Processing link: href={href}, text={text}")
+                            logger.debug("Processing link: href=%s, text=%s", href, text)
                             
                             # Extract address from account links
                             if '/account/' in href:
                                 address = href.split('/account/')[-1].split('?')[0]
                                 if self.is_valid_solana_address(address):
                                     addresses.add(address)
-                                    print(f"Found valid account address: {address}")
+                                    logger.debug("Found valid account address: %s", address)
                             
                             # Extract addresses from transaction signatures
                             elif '/tx/' in href and self.is_valid_solana_address(text):
                                 addresses.add(text)
-                                print(f"Found valid transaction address: {text}")
+                                logger.debug("Found valid transaction address: %s", text)
                                 
                         except Exception as e:
-                            print(f"Error processing link: {e}")
+                            logger.warning("Error processing link: %s", e)
                             continue
                             
                 except Exception as e:
-                    print(f"Error processing row: {e}")
+                    logger.warning("Error processing row: %s", e)
                     continue
             
             if addresses:
-                print(f"Extracted {len(addresses)} unique addresses from the current page")
+                logger.debug("Extracted %d unique addresses from the current page", len(addresses))
             
         except Exception as e:
-            print(f"Error extracting addresses from page: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error extracting addresses from page: %s", e)
             
         return addresses
         
@@ -274,6 +287,7 @@ class TransactionScraper:
             target_addresses: Number of unique addresses to collect (0 for unlimited)
             max_retries: Maximum number of retries per page
         """
+        progress = ThroughputReporter('addresses', target_addresses or None)
         try:
             page = 1
             consecutive_empty_pages = 0
@@ -291,11 +305,12 @@ class TransactionScraper:
                         page_url = f"{self.base_url}?cluster=mainnet&offset={offset}&limit={self.page_size}"
                         
                         remaining = target_addresses - len(self.wallet_addresses) if target_addresses > 0 else "unlimited"
-                        print(f"Scraping page {page} (Remaining addresses needed: {remaining})")
-                        print(f"Navigating to: {page_url}")
+                        logger.info("Scraping page %d (Remaining addresses needed: %s)", page, remaining)
+                        logger.debug("Navigating to: %s", page_url)
                         
                         # Load the page
-                        self.driver.get(page_url)
+                        with self.profiler.phase('navigation'):
+                            self.driver.get(page_url)
                         self.random_delay(self.rate_limit_delay, self.rate_limit_delay + self.rate_limit_jitter)
                         
                         # Extract addresses
@@ -304,7 +319,8 @@ class TransactionScraper:
                             prev_count = len(self.wallet_addresses)
                             self.wallet_addresses.update(new_addresses)
                             new_count = len(self.wallet_addresses) - prev_count
-                            print(f"Found {new_count} new addresses (Total: {len(self.wallet_addresses)})")
+                            logger.debug("Found %d new addresses (Total: %d)", new_count, len(self.wallet_addresses))
+                            progress.add(new_count)
                             
                             # Save progress periodically
                             if page % 5 == 0:
@@ -315,30 +331,28 @@ class TransactionScraper:
                         else:
                             retry_count += 1
                             if retry_count < max_retries:
-                                print(f"No addresses found. Retry {retry_count}/{max_retries}")
+                                logger.warning("No addresses found. Retry %d/%d", retry_count, max_retries)
                                 self.random_delay(5, 10)  # Longer delay on retry
                             else:
-                                print(f"Failed to extract addresses after {max_retries} attempts")
+                                logger.warning("Failed to extract addresses after %d attempts", max_retries)
                                 consecutive_empty_pages += 1
                                 
                     except WebDriverException as e:
-                        print(f"WebDriver error: {e}")
+                        logger.warning("WebDriver error: %s", e)
                         retry_count += 1
                         if retry_count < max_retries:
-                            print(f"Retrying... ({retry_count}/{max_retries})")
+                            logger.info("Retrying... (%d/%d)", retry_count, max_retries)
                             self.random_delay(5, 10)
                         else:
-                            print(f"Failed after {max_retries} attempts")
+                            logger.warning("Failed after %d attempts", max_retries)
                             consecutive_empty_pages += 1
                             
                     except Exception as e:
-                        print(f"Unexpected error: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        logger.exception("Unexpected error: %s", e)
                         break
                 
                 if consecutive_empty_pages >= max_empty_pages:
-                    print(f"Stopping after {max_empty_pages} consecutive empty pages")
+                    logger.warning("Stopping after %d consecutive empty pages", max_empty_pages)
                     break
                     
                 page += 1
@@ -347,11 +361,10 @@ class TransactionScraper:
                 self.save_addresses()
                     
         except Exception as e:
-            print(f"Error during scraping: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error during scraping: %s", e)
             
         finally:
+            progress.close()
             self.save_addresses()
             self.driver.quit()
             
@@ -366,7 +379,7 @@ class TransactionScraper:
             next_button.click()
             return True
         except Exception as e:
-            print(f"Error clicking next page button: {e}")
+            logger.warning("Error clicking next page button: %s", e)
             return False
     
     def save_progress(self):
@@ -380,17 +393,18 @@ class TransactionScraper:
         if filename is None:
             filename = os.path.join(self.output_dir, "scraped_addresses.csv")
             
-        df = pd.DataFrame(list(self.wallet_addresses), columns=['address'])
-        df['timestamp'] = datetime.now().isoformat()
-        df.to_csv(filename, index=False)
-        print(f"Saved {len(self.wallet_addresses)} addresses to {filename}")
+        with self.profiler.phase('save'):
+            df = pd.DataFrame(list(self.wallet_addresses), columns=['address'])
+            df['timestamp'] = datetime.now().isoformat()
+            df.to_csv(filename, index=False)
+        logger.info("Saved %d addresses to %s", len(self.wallet_addresses), filename)
     
     def cleanup(self):
         """Clean up resources"""
         try:
             self.driver.quit()
         except Exception as e:
-            print(f"Error during cleanup: {e}")
+            logger.warning("Error during cleanup: %s", e)
 
 def main():
     # Set up command line argument parsing
@@ -399,22 +413,32 @@ def main():
                         help='Number of addresses to scrape (0 for unlimited)')
     parser.add_argument('--headless', action='store_true',
                         help='Run in headless mode (no browser window)')
+    parser.add_argument('--log_level', choices=LOG_LEVELS, default='info',
+                        help='Log verbosity; quiet shows only errors and periodic throughput summaries')
+    parser.add_argument('--profile', nargs='?', const='profile', metavar='DIR',
+                        help='Profile the navigation, wait, extraction and save phases with cProfile and write '
+                             'a .prof file per phase plus report.txt to DIR (default: profile)')
     args = parser.parse_args()
+    configure_logging(args.log_level)
+    profiler = PhaseProfiler(args.profile)
     
     scraper = None
     try:
-        print(f"Starting scraper to collect {args.num_addresses if args.num_addresses > 0 else 'unlimited'} addresses")
-        print(f"Running in {'headless' if args.headless else 'visible'} mode")
+        logger.info("Starting scraper to collect %s addresses", args.num_addresses if args.num_addresses > 0 else 'unlimited')
+        logger.info("Running in %s mode", 'headless' if args.headless else 'visible')
         
-        scraper = TransactionScraper(headless=args.headless)
+        scraper = TransactionScraper(headless=args.headless, profiler=profiler)
         addresses = scraper.scrape_transactions(target_addresses=args.num_addresses)
         scraper.save_addresses()
-        print(f"Scraping completed. Total unique addresses found: {len(addresses)}")
+        logger.info("Scraping completed. Total unique addresses found: %d", len(addresses))
     except Exception as e:
-        print(f"Error during scraping: {e}")
+        logger.error("Error during scraping: %s", e)
     finally:
         if scraper:
             scraper.cleanup()
+        report_path = profiler.write_reports()
+        if report_path is not None:
+            logger.info("Wrote per-phase profiles to %s", report_path)
 
 if __name__ == "__main__":
     main()